@@ -0,0 +1,71 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.http_client import get_supabase_client
+
+
+class BatchInserter:
+    """
+    Coalesces concurrent single-row inserts into one Supabase table.
+
+    Rows queued within `delay` seconds of each other are sent as one
+    PostgREST array insert (up to `max_batch` rows). Callers still await
+    their own row: insert() returns once the batch containing it is saved,
+    or raises if it wasn't. Rows must carry their own primary key and the
+    same set of columns, since the response body isn't read.
+    """
+
+    def __init__(self, table: str, max_batch: int = 50, delay: float = 0.05):
+        self.table = table
+        self.max_batch = max_batch
+        self.delay = delay
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def insert(self, row: Dict[str, Any]):
+        """Queue row for the next batch and wait until it has been saved."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        await future
+
+    async def _flush(self):
+        while self._pending:
+            await asyncio.sleep(self.delay)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            await self._send(batch)
+
+    async def _send(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        try:
+            response = await get_supabase_client().post(
+                f"/{self.table}",
+                headers={"Prefer": "return=minimal"},
+                content=orjson.dumps([row for row, _ in batch])
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if response.status_code in [200, 201]:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+            return
+
+        if len(batch) > 1:
+            # One bad row fails the whole insert; retry rows individually so
+            # the others still get saved
+            print(f"WARNING: Batch insert into {self.table} failed ({response.status_code}), retrying {len(batch)} rows individually")
+            for item in batch:
+                await self._send([item])
+            return
+
+        _, future = batch[0]
+        if not future.done():
+            future.set_exception(Exception(f"{response.status_code} - {response.text}"))
@@ -21,6 +21,13 @@ class Settings(BaseSettings):
     GROQ_API_KEY: Optional[str] = None
     GROQ_MODEL: str = "llama-3.3-70b-versatile"  # Fast, high-quality model
     
+    # Unauthenticated /ai/test-ai-* endpoints that run a full model pass per call
+    ENABLE_TEST_ENDPOINTS: bool = True
+    
+    # Quiz/flashcard response cache
+    LLM_CACHE_TTL: int = 3600  # Seconds
+    LLM_SEMANTIC_CACHE: bool = False  # Needs sentence-transformers installed
+    
     class Config:
         env_file = Path(__file__).resolve().parent.parent / ".env"  # backend directory
         env_file_encoding = "utf-8"
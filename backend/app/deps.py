@@ -1,8 +1,10 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import httpx
+import orjson
 from typing import Dict, Any
 from app.config import settings
+from app.http_client import get_http_client, get_supabase_client
 
 security = HTTPBearer()
 
@@ -21,53 +23,49 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     
     try:
         # Call Supabase Auth API to verify token and get user info
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/auth/v1/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "apikey": settings.SUPABASE_ANON_KEY or settings.SUPABASE_SERVICE_KEY
-                }
+        client = get_http_client()
+        response = await client.get(
+            f"{settings.SUPABASE_URL}/auth/v1/user",
+            headers={
+                "Authorization": f"Bearer {token}",
+                "apikey": settings.SUPABASE_ANON_KEY or settings.SUPABASE_SERVICE_KEY
+            }
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid authentication token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        user_data = orjson.loads(response.content)
+        
+        if not user_data.get("id") or not user_data.get("email"):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid user data",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        # Fetch username from user_profiles table
+        username = "Unknown"  # Default fallback
+        try:
+            profile_response = await get_supabase_client().get(
+                f"/user_profiles?user_id=eq.{user_data['id']}&select=username"
             )
             
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid authentication token",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-            
-            user_data = response.json()
-            
-            if not user_data.get("id") or not user_data.get("email"):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid user data",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-            
-            # Fetch username from user_profiles table
-            username = "Unknown"  # Default fallback
-            try:
-                profile_response = await client.get(
-                    f"{settings.SUPABASE_URL}/rest/v1/user_profiles?user_id=eq.{user_data['id']}&select=username",
-                    headers={
-                        "apikey": settings.SUPABASE_SERVICE_KEY,
-                        "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                    }
-                )
-                
-                if profile_response.status_code == 200:
-                    profile_data = profile_response.json()
-                    if profile_data and len(profile_data) > 0:
-                        username = profile_data[0]["username"]
-                        
-            except Exception as profile_error:
-                print(f"Error fetching user profile: {profile_error}")
-                # Continue with default username
-            
-            return User(id=user_data["id"], email=user_data["email"], username=username, token=token)
-            
+            if profile_response.status_code == 200:
+                profile_data = orjson.loads(profile_response.content)
+                if profile_data:
+                    username = profile_data[0]["username"]
+                    
+        except Exception as profile_error:
+            print(f"Error fetching user profile: {profile_error}")
+            # Continue with default username
+        
+        return User(id=user_data["id"], email=user_data["email"], username=username, token=token)
+        
     except httpx.RequestError:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -88,29 +86,24 @@ async def get_admin_user(current_user: User = Depends(get_current_user)) -> User
     token = current_user.token
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Check if user is admin in user_profiles table
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/user_profiles?user_id=eq.{current_user.id}&select=is_admin",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                }
-            )
-            
-            if response.status_code == 200:
-                profile_data = response.json()
-                if profile_data and len(profile_data) > 0:
-                    is_admin = profile_data[0].get("is_admin", False)
-                    if is_admin:
-                        return current_user
-            
-            # User is not an admin
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Admin access required"
-            )
-            
+        # Check if user is admin in user_profiles table
+        response = await get_supabase_client().get(
+            f"/user_profiles?user_id=eq.{current_user.id}&select=is_admin"
+        )
+        
+        if response.status_code == 200:
+            profile_data = orjson.loads(response.content)
+            if profile_data:
+                is_admin = profile_data[0].get("is_admin", False)
+                if is_admin:
+                    return current_user
+        
+        # User is not an admin
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+        
     except HTTPException:
         raise
     except Exception as e:
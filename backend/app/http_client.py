@@ -1,25 +1,192 @@
+import asyncio
+import random
+from typing import Any
+
 import httpx
+import orjson
+from fastapi import HTTPException, status
+from app.config import settings
+
+# Upstream statuses worth retrying (rate limiting and transient server errors)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
 
 _client: httpx.AsyncClient | None = None
+_supabase_client: httpx.AsyncClient | None = None
+_groq_client: httpx.AsyncClient | None = None
+_hf_client: httpx.AsyncClient | None = None
 
 
-def get_http_client() -> httpx.AsyncClient:
-    """Return a shared httpx.AsyncClient that reuses TCP connections."""
-    global _client
-    if _client is None or _client.is_closed:
-        _client = httpx.AsyncClient(
-            timeout=30.0,
+def _new_client(**kwargs) -> httpx.AsyncClient:
+    """Build an AsyncClient with the shared pooling and timeout settings."""
+    return httpx.AsyncClient(
+        timeout=30.0,
+        # Retry connection failures at the transport level; limits must be
+        # set on the transport since the client ignores them when one is given.
+        # HTTP/2 lets concurrent requests to the same host (e.g. gathered
+        # Supabase lookups) share one connection; hosts without it fall back
+        # to HTTP/1.1 during the TLS handshake.
+        # httpx advertises and decodes gzip/deflate responses by default, and
+        # br too when brotli is installed (the brotli extra in requirements).
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=3,
             limits=httpx.Limits(
                 max_connections=20,
                 max_keepalive_connections=10,
             ),
-        )
+        ),
+        **kwargs,
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return a shared httpx.AsyncClient that reuses TCP connections."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
     return _client
 
 
+def get_supabase_client() -> httpx.AsyncClient:
+    """
+    Return the shared Supabase REST client, authenticated with the service key.
+
+    Paths are relative to /rest/v1, e.g. client.get("/quizzes", params=...).
+    """
+    global _supabase_client
+    if _supabase_client is None or _supabase_client.is_closed:
+        _supabase_client = _new_client(
+            base_url=f"{settings.SUPABASE_URL}/rest/v1",
+            headers={
+                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
+                "apikey": settings.SUPABASE_SERVICE_KEY,
+                "Content-Type": "application/json",
+            },
+        )
+    return _supabase_client
+
+
+def get_groq_client() -> httpx.AsyncClient:
+    """Return the shared Groq client (OpenAI-compatible API)."""
+    global _groq_client
+    if _groq_client is None or _groq_client.is_closed:
+        _groq_client = _new_client(
+            base_url="https://api.groq.com/openai/v1",
+            headers={
+                "Authorization": f"Bearer {settings.GROQ_API_KEY}",
+                "Content-Type": "application/json",
+            },
+        )
+    return _groq_client
+
+
+def get_hf_client() -> httpx.AsyncClient:
+    """Return the shared Hugging Face Inference API client."""
+    global _hf_client
+    if _hf_client is None or _hf_client.is_closed:
+        _hf_client = _new_client(
+            base_url="https://api-inference.huggingface.co",
+            headers={
+                "Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}",
+                "Content-Type": "application/json",
+            },
+        )
+    return _hf_client
+
+
+def _retry_after_seconds(response: httpx.Response) -> float | None:
+    """Parse a numeric Retry-After header, if present."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+async def post_with_retry(
+    client: httpx.AsyncClient,
+    url: str,
+    max_attempts: int = 4,
+    initial_backoff: float = 0.5,
+    max_backoff: float = 8.0,
+    **kwargs,
+) -> httpx.Response:
+    """
+    POST to url, retrying 429/5xx responses with exponential backoff and jitter.
+
+    A Retry-After header on the response takes precedence over the computed
+    backoff. The last response is returned once attempts are exhausted so the
+    caller can decide how to handle the failure.
+    """
+    attempt = 1
+    while True:
+        response = await client.post(url, **kwargs)
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= max_attempts:
+            return response
+
+        delay = _retry_after_seconds(response)
+        if delay is None:
+            delay = min(max_backoff, initial_backoff * 2 ** (attempt - 1))
+            delay += random.uniform(0, delay)
+        delay = min(delay, max_backoff)
+        print(f"WARNING: {url} returned {response.status_code}, retrying in {delay:.1f}s (attempt {attempt}/{max_attempts})")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def _supabase_result(response: httpx.Response, error_detail: str) -> Any:
+    """Decode a PostgREST response, turning any error status into a 500."""
+    if response.status_code >= 400:
+        print(f"ERROR: Supabase {response.request.method} {response.request.url.path} returned {response.status_code}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=error_detail,
+        )
+    return orjson.loads(response.content)
+
+
+async def sb_get(path: str, error_detail: str = "Database query failed", **params) -> Any:
+    """
+    GET a PostgREST path on the shared Supabase client and decode the rows.
+
+    Keyword arguments become query parameters, e.g.
+    sb_get("/summaries", id=f"eq.{summary_id}", select="id,summary_text").
+
+    Raises:
+        HTTPException: 500 with error_detail if Supabase answers with an error status
+    """
+    response = await get_supabase_client().get(path, params=params)
+    return _supabase_result(response, error_detail)
+
+
+async def sb_patch(path: str, data: dict, error_detail: str = "Database update failed", **params) -> Any:
+    """
+    PATCH the rows matching params and return them as updated.
+
+    Raises:
+        HTTPException: 500 with error_detail if Supabase answers with an error status
+    """
+    response = await get_supabase_client().patch(
+        path,
+        headers={"Prefer": "return=representation"},
+        params=params,
+        content=orjson.dumps(data),
+    )
+    return _supabase_result(response, error_detail)
+
+
+def open_http_clients():
+    """Create the shared clients every request path uses (called on app startup)."""
+    get_http_client()
+    get_supabase_client()
+
+
 async def close_http_client():
-    """Close the shared client gracefully (called on app shutdown)."""
-    global _client
-    if _client is not None:
-        await _client.aclose()
-        _client = None
+    """Close the shared clients gracefully (called on app shutdown)."""
+    global _client, _supabase_client, _groq_client, _hf_client
+    for client in (_client, _supabase_client, _groq_client, _hf_client):
+        if client is not None:
+            await client.aclose()
+    _client = _supabase_client = _groq_client = _hf_client = None
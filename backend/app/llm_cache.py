@@ -0,0 +1,183 @@
+import asyncio
+import copy
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Sentence embedding model for the semantic tier, loaded on first use
+_EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+_embedding_model = None
+_embedding_unavailable = False
+# all-MiniLM-L6-v2 reads at most 256 tokens, so longer texts are embedded in
+# pieces of about that size and the piece embeddings averaged
+_EMBEDDING_CHUNK_CHARS = 1000
+
+
+def _get_embedding_model():
+    """Load the sentence-transformers model once; None if it can't be imported."""
+    global _embedding_model, _embedding_unavailable
+    if _embedding_model is None and not _embedding_unavailable:
+        try:
+            from sentence_transformers import SentenceTransformer
+            _embedding_model = SentenceTransformer(_EMBEDDING_MODEL_NAME)
+            print(f"SUCCESS: Loaded {_EMBEDDING_MODEL_NAME} for the semantic LLM cache")
+        except Exception as e:
+            print(f"WARNING: Semantic LLM cache disabled, embedding model unavailable: {e}")
+            _embedding_unavailable = True
+    return _embedding_model
+
+
+def _embed(text: str):
+    """Return a unit-length embedding of all of text, or None (runs in a worker thread)."""
+    model = _get_embedding_model()
+    if model is None:
+        return None
+
+    import numpy as np
+
+    chunks = [text[i:i + _EMBEDDING_CHUNK_CHARS] for i in range(0, len(text), _EMBEDDING_CHUNK_CHARS)]
+    mean = model.encode(chunks, normalize_embeddings=True).mean(axis=0)
+    return mean / np.linalg.norm(mean)
+
+
+class LLMCache:
+    """
+    In-memory cache for LLM responses.
+
+    Lookups try an exact tier first, keyed on a hash of everything that
+    shapes the response (model, prompt, requested count). When the semantic
+    tier is enabled, a miss falls back to comparing an embedding of the source
+    text against cached entries in the same namespace and reuses the closest
+    response if its cosine similarity clears the threshold.
+    """
+
+    def __init__(
+        self,
+        ttl: int = 3600,
+        max_entries: int = 256,
+        semantic: bool = False,
+        similarity_threshold: float = 0.92,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        # key -> (expires_at, namespace, embedding or None, value)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Build a stable SHA-256 key from the given request parts."""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+        for key in expired:
+            del self._entries[key]
+
+    async def _embedding_for(self, text: Optional[str]):
+        if not self.semantic or not text or _embedding_unavailable:
+            return None
+        try:
+            return await asyncio.to_thread(_embed, text)
+        except Exception as e:
+            print(f"WARNING: Failed to embed text for LLM cache: {e}")
+            return None
+
+    async def get(self, key: str, namespace: str = "", text: Optional[str] = None) -> Optional[Any]:
+        """
+        Return a cached response, or None on a miss.
+
+        Args:
+            key: Exact-match key from make_key()
+            namespace: Semantic matches are only considered within a namespace
+            text: Source text to compare against when the exact tier misses
+        """
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return copy.deepcopy(entry[3])
+
+        query = await self._embedding_for(text)
+        if query is None:
+            return None
+
+        import numpy as np
+
+        candidates = [
+            (entry_key, entry) for entry_key, entry in self._entries.items()
+            if entry[1] == namespace and entry[2] is not None
+        ]
+        if not candidates:
+            return None
+
+        matrix = np.stack([entry[2] for _, entry in candidates])
+        scores = matrix @ query
+        best = int(scores.argmax())
+        if scores[best] < self.similarity_threshold:
+            return None
+
+        best_key, best_entry = candidates[best]
+        self._entries.move_to_end(best_key)
+        print(f"INFO: Semantic LLM cache hit (similarity {scores[best]:.3f})")
+        return copy.deepcopy(best_entry[3])
+
+    async def set(self, key: str, value: Any, namespace: str = "", text: Optional[str] = None):
+        """Store a response under key, embedding text for the semantic tier if enabled."""
+        embedding = await self._embedding_for(text)
+        self._entries[key] = (time.monotonic() + self.ttl, namespace, embedding, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        """Drop the entry for key, if any."""
+        self._entries.pop(key, None)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into a single in-flight call.
+
+    The first caller for a key runs the coroutine; callers arriving while it
+    is still running wait for the same result (or exception) instead of
+    starting their own.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func() for key, or wait on the call already in flight for it."""
+        future = self._inflight.get(key)
+        if future is not None:
+            print(f"INFO: Joining in-flight request for {key[:16]}")
+            # Shield so a cancelled waiter doesn't cancel the shared future
+            return copy.deepcopy(await asyncio.shield(future))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await func()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        except BaseException:
+            # The leader was cancelled (e.g. a hedged request that lost);
+            # fail the waiters rather than cancelling their requests too
+            future.set_exception(RuntimeError("In-flight request was cancelled"))
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
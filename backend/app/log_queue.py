@@ -0,0 +1,42 @@
+import logging
+import logging.handlers
+import queue
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: logging.handlers.QueueHandler | None = None
+
+
+def start_log_listener(level: int = logging.INFO):
+    """
+    Route log records through a queue so handlers write on a background thread.
+
+    Request handlers only put the record on the queue; the stream write to
+    stderr happens in the listener thread, off the event loop. level applies
+    to the app's own loggers only; libraries keep the root's WARNING, so
+    httpx doesn't log every request URL.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    logging.getLogger().addHandler(_queue_handler)
+    logging.getLogger("app").setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_log_listener():
+    """Flush queued records and stop the listener thread (called on app shutdown)."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
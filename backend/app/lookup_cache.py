@@ -0,0 +1,68 @@
+from app.llm_cache import LLMCache, SingleFlight
+
+# Existing quizzes, summaries and flashcards are looked up on every generate request, but
+# only change when they are saved, edited or deleted. Found rows are kept for a
+# short while (misses aren't cached), and every write path invalidates them.
+LOOKUP_CACHE_TTL = 60
+
+existing_quiz_cache = LLMCache(ttl=LOOKUP_CACHE_TTL, max_entries=1024)
+existing_summary_cache = LLMCache(ttl=LOOKUP_CACHE_TTL, max_entries=1024)
+existing_flashcards_cache = LLMCache(ttl=LOOKUP_CACHE_TTL, max_entries=1024)
+
+# Card states (and their due/finished counts) are fetched whenever a study
+# session opens; they change only when a card is reviewed, which invalidates
+# them, so the short TTL just bounds how stale "due now" can get
+CARD_STATES_CACHE_TTL = 30
+
+card_states_cache = LLMCache(ttl=CARD_STATES_CACHE_TTL, max_entries=1024)
+
+# A user's streak changes at most once a day, when they first study; every
+# path that records study activity invalidates it. Keyed by user_id
+STREAK_CACHE_TTL = 30
+
+streak_profile_cache = LLMCache(ttl=STREAK_CACHE_TTL, max_entries=1024)
+
+# Filenames aren't cached here: every list/detail endpoint embeds
+# files(filename) in the same PostgREST query, so there is no separate
+# file lookup left to save
+
+# A burst of requests for the same file (e.g. quiz and flashcards generated
+# together) misses the cache at the same time; they share one lookup instead
+in_flight_lookups = SingleFlight()
+
+
+def file_cache_key(file_id: str, user_id: str) -> str:
+    """Cache key for a per-file lookup."""
+    return f"{user_id}:{file_id}"
+
+
+def invalidate_quiz(file_id: str, user_id: str):
+    """Forget the cached quiz for a file."""
+    existing_quiz_cache.invalidate(file_cache_key(file_id, user_id))
+
+
+def invalidate_summary(file_id: str, user_id: str):
+    """Forget the cached summary for a file."""
+    existing_summary_cache.invalidate(file_cache_key(file_id, user_id))
+
+
+def invalidate_flashcards(file_id: str, user_id: str):
+    """Forget the cached flashcards for a file."""
+    existing_flashcards_cache.invalidate(file_cache_key(file_id, user_id))
+
+
+def invalidate_file(file_id: str, user_id: str):
+    """Forget every cached lookup for a file (e.g. after it's deleted)."""
+    invalidate_quiz(file_id, user_id)
+    invalidate_summary(file_id, user_id)
+    invalidate_flashcards(file_id, user_id)
+
+
+def invalidate_card_states(flashcard_set_id: str, user_id: str):
+    """Forget the cached card states for a flashcard set."""
+    card_states_cache.invalidate(file_cache_key(flashcard_set_id, user_id))
+
+
+def invalidate_streak(user_id: str):
+    """Forget the cached streak profile for a user."""
+    streak_profile_cache.invalidate(user_id)
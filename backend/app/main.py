@@ -1,21 +1,39 @@
 from dotenv import load_dotenv
 from pathlib import Path
+from contextlib import asynccontextmanager
 
 # Load .env from backend directory before any other imports
 BASE_DIR = Path(__file__).resolve().parent.parent  # points to backend/
 load_dotenv(BASE_DIR / ".env")  # loads from backend directory
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, protected, files, ai_processing, deletion, folders, chat, admin, feedback
 from app.config import settings
+from app.http_client import close_http_client, open_http_clients
+from app.log_queue import start_log_listener, stop_log_listener
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the pooled upstream clients once up front, and release their
+    # connections on shutdown. Logging goes through a queue so handlers
+    # don't write to stderr on the event loop
+    start_log_listener()
+    open_http_clients()
+    yield
+    await close_http_client()
+    stop_log_listener()
 
 allowed_origins = [origin.strip() for origin in settings.CORS_ORIGINS.split(",") if origin.strip()]
 
 app = FastAPI(
     title="AI Exam-Prep Tutor API",
     description="Backend API for AI-powered exam preparation tool",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # Serialize endpoint return values with orjson rather than the stdlib json module
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware for frontend integration
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel
 from typing import List, Optional
 import httpx
+import orjson
 import asyncio
 from datetime import datetime, timezone, timedelta
 from app.deps import get_admin_user, User
@@ -97,7 +98,7 @@ async def get_dashboard_stats(
                 
                 response = await client.get(url, headers=headers, params=params)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     if isinstance(data, list):
                         return len(data)
                     # Try to get from Content-Range header
@@ -143,7 +144,7 @@ async def get_dashboard_stats(
                 response = await client.get(url, headers=headers, params=params)
                 user_set = set()
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     if isinstance(data, list):
                         for item in data:
                             if item.get("user_id"):
@@ -220,7 +221,7 @@ async def get_users(
                     detail="Failed to fetch users"
                 )
             
-            profiles = response.json()
+            profiles = orjson.loads(response.content)
             if not isinstance(profiles, list):
                 profiles = []
             
@@ -244,7 +245,7 @@ async def get_users(
                 
                 email = "N/A"
                 if auth_response.status_code == 200:
-                    auth_data = auth_response.json()
+                    auth_data = orjson.loads(auth_response.content)
                     email = auth_data.get("email", "N/A")
                 
                 # Apply search filter for email if search is provided
@@ -303,8 +304,8 @@ async def get_user_details(
                     detail="User not found"
                 )
             
-            profiles = response.json()
-            if not profiles or len(profiles) == 0:
+            profiles = orjson.loads(response.content)
+            if not profiles:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="User not found"
@@ -324,7 +325,7 @@ async def get_user_details(
             
             email = "N/A"
             if auth_response.status_code == 200:
-                auth_data = auth_response.json()
+                auth_data = orjson.loads(auth_response.content)
                 email = auth_data.get("email", "N/A")
             
             return UserInfo(
@@ -368,7 +369,7 @@ async def deactivate_user(
                 "apikey": settings.SUPABASE_SERVICE_KEY,
                 "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
                 "Content-Type": "application/json",
-                "Prefer": "return=representation"
+                "Prefer": "return=minimal"
             }
             
             # Update is_active to False in user_profiles
@@ -410,7 +411,7 @@ async def activate_user(
                 "apikey": settings.SUPABASE_SERVICE_KEY,
                 "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
                 "Content-Type": "application/json",
-                "Prefer": "return=representation"
+                "Prefer": "return=minimal"
             }
             
             # Update is_active to True in user_profiles
@@ -471,7 +472,7 @@ async def get_quiz_performance_by_topic(
             if interactions_response.status_code != 200:
                 return []
             
-            interactions = interactions_response.json()
+            interactions = orjson.loads(interactions_response.content)
             if not isinstance(interactions, list):
                 return []
             
@@ -485,7 +486,7 @@ async def get_quiz_performance_by_topic(
             if quizzes_response.status_code != 200:
                 return []
             
-            quizzes = quizzes_response.json()
+            quizzes = orjson.loads(quizzes_response.content)
             if not isinstance(quizzes, list):
                 return []
             
@@ -568,7 +569,7 @@ async def get_most_attempted_topics(
             if interactions_response.status_code != 200:
                 return []
             
-            interactions = interactions_response.json()
+            interactions = orjson.loads(interactions_response.content)
             if not isinstance(interactions, list):
                 return []
             
@@ -582,7 +583,7 @@ async def get_most_attempted_topics(
             if quizzes_response.status_code != 200:
                 return []
             
-            quizzes = quizzes_response.json()
+            quizzes = orjson.loads(quizzes_response.content)
             if not isinstance(quizzes, list):
                 return []
             
@@ -654,7 +655,7 @@ async def get_flashcard_difficulty(
             if reviews_response.status_code != 200:
                 return FlashcardDifficulty(again_count=0, good_count=0, easy_count=0)
             
-            reviews = reviews_response.json()
+            reviews = orjson.loads(reviews_response.content)
             if not isinstance(reviews, list):
                 return FlashcardDifficulty(again_count=0, good_count=0, easy_count=0)
             
@@ -730,7 +731,7 @@ async def get_daily_study_activity(
             interactions_response = await client.get(interactions_url, headers=headers, params=interactions_params)
             
             if interactions_response.status_code == 200:
-                interactions = interactions_response.json()
+                interactions = orjson.loads(interactions_response.content)
                 if isinstance(interactions, list):
                     # Count unique quiz interactions per day (group by user_id and quiz_id per day)
                     # For simplicity, we'll count all interactions per day
@@ -763,7 +764,7 @@ async def get_daily_study_activity(
             reviews_response = await client.get(reviews_url, headers=headers, params=reviews_params)
             
             if reviews_response.status_code == 200:
-                reviews = reviews_response.json()
+                reviews = orjson.loads(reviews_response.content)
                 if isinstance(reviews, list):
                     # Count flashcard reviews per day
                     daily_flashcard_counts = {}
@@ -837,7 +838,7 @@ async def get_user_growth(
                 current += timedelta(days=1)
 
             if response.status_code == 200:
-                rows = response.json()
+                rows = orjson.loads(response.content)
                 print(f"[user-growth] fetched {len(rows) if isinstance(rows, list) else '?'} user_profiles rows")
                 if isinstance(rows, list):
                     for row in rows:
@@ -896,7 +897,7 @@ async def get_feature_usage(
                     params.update(extra_params)
                 resp = await client.get(url, headers=headers, params=params)
                 if resp.status_code == 200:
-                    data = resp.json()
+                    data = orjson.loads(resp.content)
                     if isinstance(data, list):
                         return len(data)
                 return 0
@@ -907,7 +908,7 @@ async def get_feature_usage(
                 resp = await client.get(url, headers=headers, params={"select": "created_at"})
                 if resp.status_code != 200:
                     return 0
-                rows = resp.json()
+                rows = orjson.loads(resp.content)
                 count = 0
                 if isinstance(rows, list):
                     for row in rows:
@@ -985,7 +986,7 @@ async def get_content_activity(
                 resp = await client.get(url, headers=headers, params=params)
                 counts: dict = {}
                 if resp.status_code == 200:
-                    rows = resp.json()
+                    rows = orjson.loads(resp.content)
                     print(f"[content-activity] {table}: fetched {len(rows) if isinstance(rows, list) else '?'} rows")
                     if isinstance(rows, list):
                         for row in rows:
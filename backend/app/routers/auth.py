@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, EmailStr, field_validator
 import httpx
+import orjson
 from app.config import settings
 
 router = APIRouter()
@@ -95,7 +96,7 @@ async def signup(request: SignupRequest):
             
             # Handle successful responses (200, 201, or any 2xx status)
             if 200 <= response.status_code < 300:
-                user_data = response.json()
+                user_data = orjson.loads(response.content)
                 print(f"User data structure: {user_data}")
                 
                 # Extract user ID and email from different possible response structures
@@ -164,13 +165,13 @@ async def signup(request: SignupRequest):
                     message="User created successfully"
                 )
             elif response.status_code == 422:
-                error_data = response.json()
+                error_data = orjson.loads(response.content)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Invalid input: {error_data.get('msg', 'Validation error')}"
                 )
             elif response.status_code == 400:
-                error_data = response.json()
+                error_data = orjson.loads(response.content)
                 error_msg = error_data.get("msg", "Invalid input")
                 print(f"400 Error Details: {error_msg}")
                 
@@ -185,7 +186,7 @@ async def signup(request: SignupRequest):
                         detail=f"Signup failed: {error_msg}"
                     )
             else:
-                error_data = response.json() if response.content else {}
+                error_data = orjson.loads(response.content) if response.content else {}
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail=f"Failed to create user: {error_data.get('msg', 'Unknown error')}"
@@ -225,7 +226,7 @@ async def login(request: LoginRequest):
             )
             
             if response.status_code == 200:
-                auth_data = response.json()
+                auth_data = orjson.loads(response.content)
                 user_data = auth_data.get("user", {})
                 user_id = user_data["id"]
                 
@@ -241,8 +242,8 @@ async def login(request: LoginRequest):
                     )
                     
                     if profile_response.status_code == 200:
-                        profile_data = profile_response.json()
-                        if profile_data and len(profile_data) > 0:
+                        profile_data = orjson.loads(profile_response.content)
+                        if profile_data:
                             username = profile_data[0]["username"]
                             
                 except Exception as profile_error:
@@ -258,7 +259,7 @@ async def login(request: LoginRequest):
                     email=user_data["email"]
                 )
             elif response.status_code == 400:
-                error_data = response.json()
+                error_data = orjson.loads(response.content)
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail=error_data.get("error_description", "Invalid credentials")
@@ -1,8 +1,9 @@
-import httpx
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from app.deps import get_current_user, User
 from app.config import settings
+from app.http_client import get_groq_client
 
 router = APIRouter()
 
@@ -55,9 +56,9 @@ class NotesEditChatRequest(BaseModel):
 async def _chat_with_groq_api(message: str, notes: str) -> str:
     """Chat with notes context using Groq API."""
     try:
-        async with httpx.AsyncClient() as client:
-            # Construct the prompt with notes context
-            system_prompt = """You are a helpful study assistant. Your role is to help students understand their notes by:
+        client = get_groq_client()
+        # Construct the prompt with notes context
+        system_prompt = """You are a helpful study assistant. Your role is to help students understand their notes by:
 - Providing clear explanations of concepts
 - Summarizing content when asked
 - Simplifying complex topics
@@ -67,7 +68,7 @@ async def _chat_with_groq_api(message: str, notes: str) -> str:
 
 Always base your responses ONLY on the notes provided by the user. If the notes don't contain relevant information, politely say so."""
 
-            user_prompt = f"""The user provided these notes:
+        user_prompt = f"""The user provided these notes:
 
 {notes}
 
@@ -75,43 +76,39 @@ User's question: {message}
 
 Please provide a helpful response based on the notes above."""
 
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": settings.GROQ_MODEL,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": system_prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": user_prompt
-                        }
-                    ],
-                    "max_tokens": 1000,
-                    "temperature": 0.7,
-                    "top_p": 0.9
-                },
-                timeout=60.0
-            )
+        response = await client.post(
+            "/chat/completions",
+            content=orjson.dumps({
+                "model": settings.GROQ_MODEL,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": system_prompt
+                    },
+                    {
+                        "role": "user",
+                        "content": user_prompt
+                    }
+                ],
+                "max_tokens": 1000,
+                "temperature": 0.7,
+                "top_p": 0.9
+            }),
+            timeout=60.0
+        )
 
-            if response.status_code == 200:
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    reply = result["choices"][0]["message"]["content"].strip()
-                    print(f"SUCCESS: Groq chat response generated")
-                    return reply
-                else:
-                    raise Exception("Groq API returned unexpected format")
+        if response.status_code == 200:
+            result = orjson.loads(response.content)
+            if result.get("choices"):
+                reply = result["choices"][0]["message"]["content"].strip()
+                print(f"SUCCESS: Groq chat response generated")
+                return reply
             else:
-                error_text = response.text
-                print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
-                raise Exception(f"Groq API error: {response.status_code}")
+                raise Exception("Groq API returned unexpected format")
+        else:
+            error_text = response.text
+            print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
+            raise Exception(f"Groq API error: {response.status_code}")
 
     except Exception as e:
         print(f"ERROR: Groq API chat error: {str(e)}")
@@ -212,9 +209,9 @@ async def _chat_quiz_with_groq_api(
 ) -> str:
     """Chat with quiz context using Groq API."""
     try:
-        async with httpx.AsyncClient() as client:
-            # Construct the prompt with quiz context
-            system_prompt = """You are PrepWise, an AI tutor. Your role is to help students understand quiz questions by:
+        client = get_groq_client()
+        # Construct the prompt with quiz context
+        system_prompt = """You are PrepWise, an AI tutor. Your role is to help students understand quiz questions by:
 - Explaining why the correct answer is correct
 - Explaining why wrong answers are wrong (if applicable)
 - Breaking down concepts related to the question
@@ -223,12 +220,12 @@ async def _chat_quiz_with_groq_api(
 
 Use a friendly, encouraging tone. Be clear and concise. Help students learn from their mistakes without being condescending."""
 
-            # Build the quiz context
-            if question and options and correct_answer:
-                # Specific question context
-                options_text = "\n".join([f"{chr(65+i)}. {opt}" for i, opt in enumerate(options)])
-                
-                quiz_context = f"""Here is the quiz question:
+        # Build the quiz context
+        if question and options and correct_answer:
+            # Specific question context
+            options_text = "\n".join([f"{chr(65+i)}. {opt}" for i, opt in enumerate(options)])
+            
+            quiz_context = f"""Here is the quiz question:
 
 Question: {question}
 
@@ -236,73 +233,69 @@ Options:
 {options_text}
 
 Correct Answer: {correct_answer}"""
-                
-                if user_answer is not None:
-                    quiz_context += f"\nUser's Answer: {user_answer}"
-                
-                if topic_name:
-                    quiz_context += f"\nTopic: {topic_name}"
-                
-                if explanation:
-                    quiz_context += f"\nExplanation: {explanation}"
-            else:
-                # General quiz context
-                quiz_context = f"""The user is asking about a quiz"""
-                if quiz_name:
-                    quiz_context += f" titled: {quiz_name}"
-                if topic_name:
-                    quiz_context += f" on the topic: {topic_name}"
-                if all_questions:
-                    quiz_context += f"\n\nThe quiz contains {len(all_questions)} questions:\n"
-                    for idx, q in enumerate(all_questions[:10]):  # Limit to first 10 questions
-                        quiz_context += f"\nQuestion {idx + 1}: {q.get('question', 'N/A')}\n"
-                        quiz_context += f"Options: {', '.join(q.get('options', []))}\n"
-                        quiz_context += f"Correct Answer: {q.get('options', [])[q.get('answer_index', 0)] if q.get('options') else 'N/A'}\n"
-                quiz_context += "\nPlease help the user understand the quiz concepts, topics, or answer general questions about the quiz."
-
-            user_prompt = f"""{quiz_context}
+            
+            if user_answer is not None:
+                quiz_context += f"\nUser's Answer: {user_answer}"
+            
+            if topic_name:
+                quiz_context += f"\nTopic: {topic_name}"
+            
+            if explanation:
+                quiz_context += f"\nExplanation: {explanation}"
+        else:
+            # General quiz context
+            quiz_context = f"""The user is asking about a quiz"""
+            if quiz_name:
+                quiz_context += f" titled: {quiz_name}"
+            if topic_name:
+                quiz_context += f" on the topic: {topic_name}"
+            if all_questions:
+                quiz_context += f"\n\nThe quiz contains {len(all_questions)} questions:\n"
+                for idx, q in enumerate(all_questions[:10]):  # Limit to first 10 questions
+                    quiz_context += f"\nQuestion {idx + 1}: {q.get('question', 'N/A')}\n"
+                    quiz_context += f"Options: {', '.join(q.get('options', []))}\n"
+                    quiz_context += f"Correct Answer: {q.get('options', [])[q.get('answer_index', 0)] if q.get('options') else 'N/A'}\n"
+            quiz_context += "\nPlease help the user understand the quiz concepts, topics, or answer general questions about the quiz."
+
+        user_prompt = f"""{quiz_context}
 
 User's question: {message}
 
 Please provide a helpful response about this quiz question."""
 
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": settings.GROQ_MODEL,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": system_prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": user_prompt
-                        }
-                    ],
-                    "max_tokens": 1000,
-                    "temperature": 0.7,
-                    "top_p": 0.9
-                },
-                timeout=60.0
-            )
+        response = await client.post(
+            "/chat/completions",
+            content=orjson.dumps({
+                "model": settings.GROQ_MODEL,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": system_prompt
+                    },
+                    {
+                        "role": "user",
+                        "content": user_prompt
+                    }
+                ],
+                "max_tokens": 1000,
+                "temperature": 0.7,
+                "top_p": 0.9
+            }),
+            timeout=60.0
+        )
 
-            if response.status_code == 200:
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    reply = result["choices"][0]["message"]["content"].strip()
-                    print(f"SUCCESS: Groq quiz chat response generated")
-                    return reply
-                else:
-                    raise Exception("Groq API returned unexpected format")
+        if response.status_code == 200:
+            result = orjson.loads(response.content)
+            if result.get("choices"):
+                reply = result["choices"][0]["message"]["content"].strip()
+                print(f"SUCCESS: Groq quiz chat response generated")
+                return reply
             else:
-                error_text = response.text
-                print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
-                raise Exception(f"Groq API error: {response.status_code}")
+                raise Exception("Groq API returned unexpected format")
+        else:
+            error_text = response.text
+            print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
+            raise Exception(f"Groq API error: {response.status_code}")
 
     except Exception as e:
         print(f"ERROR: Groq API quiz chat error: {str(e)}")
@@ -411,7 +404,7 @@ async def chat_with_quiz(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Correct answer cannot be empty"
                 )
-        elif not request.all_questions or len(request.all_questions) == 0:
+        elif not request.all_questions:
             # If no specific question, need all_questions for general context
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -452,9 +445,9 @@ async def _chat_flashcard_with_groq_api(
 ) -> str:
     """Chat with flashcard context using Groq API."""
     try:
-        async with httpx.AsyncClient() as client:
-            # Construct the prompt with flashcard context
-            system_prompt = """You are PrepWise, an AI assistant helping the user understand a flashcard.
+        client = get_groq_client()
+        # Construct the prompt with flashcard context
+        system_prompt = """You are PrepWise, an AI assistant helping the user understand a flashcard.
 
 Explain the card in simple terms.
 Give examples if helpful.
@@ -471,75 +464,71 @@ Your role is to help students understand flashcards by:
 
 Use a friendly, encouraging tone. Be clear and concise."""
 
-            # Build the flashcard context
-            if front and back:
-                # Specific flashcard context
-                flashcard_context = f"""Here is the flashcard:
+        # Build the flashcard context
+        if front and back:
+            # Specific flashcard context
+            flashcard_context = f"""Here is the flashcard:
 
 Front (Question/Term): {front}
 
 Back (Answer/Definition): {back}"""
-                
-                if topic_name:
-                    flashcard_context += f"\nTopic/Category: {topic_name}"
-            else:
-                # General flashcard set context
-                flashcard_context = f"""The user is asking about flashcards"""
-                if flashcard_set_name:
-                    flashcard_context += f" from the set: {flashcard_set_name}"
-                if topic_name:
-                    flashcard_context += f" on the topic: {topic_name}"
-                if all_flashcards:
-                    flashcard_context += f"\n\nThe flashcard set contains {len(all_flashcards)} cards:\n"
-                    for idx, card in enumerate(all_flashcards[:10]):  # Limit to first 10 cards
-                        flashcard_context += f"\nCard {idx + 1}:\n"
-                        flashcard_context += f"Front: {card.get('front', 'N/A')}\n"
-                        flashcard_context += f"Back: {card.get('back', 'N/A')}\n"
-                flashcard_context += "\nPlease help the user understand the flashcard concepts, terms, or answer general questions about the flashcards."
-
-            user_prompt = f"""{flashcard_context}
+            
+            if topic_name:
+                flashcard_context += f"\nTopic/Category: {topic_name}"
+        else:
+            # General flashcard set context
+            flashcard_context = f"""The user is asking about flashcards"""
+            if flashcard_set_name:
+                flashcard_context += f" from the set: {flashcard_set_name}"
+            if topic_name:
+                flashcard_context += f" on the topic: {topic_name}"
+            if all_flashcards:
+                flashcard_context += f"\n\nThe flashcard set contains {len(all_flashcards)} cards:\n"
+                for idx, card in enumerate(all_flashcards[:10]):  # Limit to first 10 cards
+                    flashcard_context += f"\nCard {idx + 1}:\n"
+                    flashcard_context += f"Front: {card.get('front', 'N/A')}\n"
+                    flashcard_context += f"Back: {card.get('back', 'N/A')}\n"
+            flashcard_context += "\nPlease help the user understand the flashcard concepts, terms, or answer general questions about the flashcards."
+
+        user_prompt = f"""{flashcard_context}
 
 User's question: {message}
 
 Please provide a helpful response about this flashcard."""
 
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": settings.GROQ_MODEL,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": system_prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": user_prompt
-                        }
-                    ],
-                    "max_tokens": 1000,
-                    "temperature": 0.7,
-                    "top_p": 0.9
-                },
-                timeout=60.0
-            )
+        response = await client.post(
+            "/chat/completions",
+            content=orjson.dumps({
+                "model": settings.GROQ_MODEL,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": system_prompt
+                    },
+                    {
+                        "role": "user",
+                        "content": user_prompt
+                    }
+                ],
+                "max_tokens": 1000,
+                "temperature": 0.7,
+                "top_p": 0.9
+            }),
+            timeout=60.0
+        )
 
-            if response.status_code == 200:
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    reply = result["choices"][0]["message"]["content"].strip()
-                    print(f"SUCCESS: Groq flashcard chat response generated")
-                    return reply
-                else:
-                    raise Exception("Groq API returned unexpected format")
+        if response.status_code == 200:
+            result = orjson.loads(response.content)
+            if result.get("choices"):
+                reply = result["choices"][0]["message"]["content"].strip()
+                print(f"SUCCESS: Groq flashcard chat response generated")
+                return reply
             else:
-                error_text = response.text
-                print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
-                raise Exception(f"Groq API error: {response.status_code}")
+                raise Exception("Groq API returned unexpected format")
+        else:
+            error_text = response.text
+            print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
+            raise Exception(f"Groq API error: {response.status_code}")
 
     except Exception as e:
         print(f"ERROR: Groq API flashcard chat error: {str(e)}")
@@ -655,7 +644,7 @@ async def chat_with_flashcard(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Back text cannot be empty"
                 )
-        elif not request.all_flashcards or len(request.all_flashcards) == 0:
+        elif not request.all_flashcards:
             # If no specific flashcard, need all_flashcards for general context
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -692,8 +681,8 @@ async def _chat_quiz_edit_with_groq_api(
 ) -> str:
     """Chat for quiz editing using Groq API."""
     try:
-        async with httpx.AsyncClient() as client:
-            system_prompt = """You are PrepWise, an AI assistant helping users improve and edit their quiz questions.
+        client = get_groq_client()
+        system_prompt = """You are PrepWise, an AI assistant helping users improve and edit their quiz questions.
 
 Your role is to:
 - Generate new quiz questions based on user requests
@@ -720,85 +709,81 @@ If the user is asking for general help or explanations (not generating questions
 
 Always be helpful, clear, and educational."""
 
-            # Build context from current questions
-            context_parts = []
-            if quiz_name:
-                context_parts.append(f"Quiz Name: {quiz_name}")
-            if filename:
-                context_parts.append(f"Source File: {filename}")
-            
-            # If a specific question is selected, focus on that
+        # Build context from current questions
+        context_parts = []
+        if quiz_name:
+            context_parts.append(f"Quiz Name: {quiz_name}")
+        if filename:
+            context_parts.append(f"Source File: {filename}")
+        
+        # If a specific question is selected, focus on that
+        if selected_question:
+            context_parts.append("\n=== FOCUS QUESTION (User wants help with this specific question) ===")
+            context_parts.append(f"Question: {selected_question.get('question', '')}")
+            options = selected_question.get('options', [])
+            if options:
+                context_parts.append(f"Options: {', '.join(options)}")
+                answer_idx = selected_question.get('answer_index', 0)
+                if answer_idx < len(options):
+                    context_parts.append(f"Correct Answer: {options[answer_idx]}")
+            context_parts.append("===\n")
+        
+        if current_questions:
             if selected_question:
-                context_parts.append("\n=== FOCUS QUESTION (User wants help with this specific question) ===")
-                context_parts.append(f"Question: {selected_question.get('question', '')}")
-                options = selected_question.get('options', [])
+                context_parts.append("\nAll quiz questions (for context):")
+            else:
+                context_parts.append("\nCurrent quiz questions:")
+            for i, q in enumerate(current_questions[:5], 1):  # Limit to first 5 for context
+                context_parts.append(f"\nQuestion {i}: {q.get('question', '')}")
+                options = q.get('options', [])
                 if options:
                     context_parts.append(f"Options: {', '.join(options)}")
-                    answer_idx = selected_question.get('answer_index', 0)
+                    answer_idx = q.get('answer_index', 0)
                     if answer_idx < len(options):
                         context_parts.append(f"Correct Answer: {options[answer_idx]}")
-                context_parts.append("===\n")
-            
-            if current_questions and len(current_questions) > 0:
-                if selected_question:
-                    context_parts.append("\nAll quiz questions (for context):")
-                else:
-                    context_parts.append("\nCurrent quiz questions:")
-                for i, q in enumerate(current_questions[:5], 1):  # Limit to first 5 for context
-                    context_parts.append(f"\nQuestion {i}: {q.get('question', '')}")
-                    options = q.get('options', [])
-                    if options:
-                        context_parts.append(f"Options: {', '.join(options)}")
-                        answer_idx = q.get('answer_index', 0)
-                        if answer_idx < len(options):
-                            context_parts.append(f"Correct Answer: {options[answer_idx]}")
-            
-            context = "\n".join(context_parts) if context_parts else "No current questions provided."
+        
+        context = "\n".join(context_parts) if context_parts else "No current questions provided."
 
-            user_prompt = f"""Context:
+        user_prompt = f"""Context:
 {context}
 
 User's request: {message}
 
 Please help the user with their quiz editing request. If they're asking for new questions, provide them in the JSON format specified."""
 
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": settings.GROQ_MODEL,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": system_prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": user_prompt
-                        }
-                    ],
-                    "max_tokens": 2000,
-                    "temperature": 0.7,
-                    "top_p": 0.9
-                },
-                timeout=60.0
-            )
+        response = await client.post(
+            "/chat/completions",
+            content=orjson.dumps({
+                "model": settings.GROQ_MODEL,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": system_prompt
+                    },
+                    {
+                        "role": "user",
+                        "content": user_prompt
+                    }
+                ],
+                "max_tokens": 2000,
+                "temperature": 0.7,
+                "top_p": 0.9
+            }),
+            timeout=60.0
+        )
 
-            if response.status_code == 200:
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    reply = result["choices"][0]["message"]["content"].strip()
-                    print(f"SUCCESS: Groq quiz edit chat response generated")
-                    return reply
-                else:
-                    raise Exception("Groq API returned unexpected format")
+        if response.status_code == 200:
+            result = orjson.loads(response.content)
+            if result.get("choices"):
+                reply = result["choices"][0]["message"]["content"].strip()
+                print(f"SUCCESS: Groq quiz edit chat response generated")
+                return reply
             else:
-                error_text = response.text
-                print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
-                raise Exception(f"Groq API error: {response.status_code}")
+                raise Exception("Groq API returned unexpected format")
+        else:
+            error_text = response.text
+            print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
+            raise Exception(f"Groq API error: {response.status_code}")
 
     except Exception as e:
         print(f"ERROR: Groq API quiz edit chat error: {str(e)}")
@@ -873,8 +858,8 @@ async def _chat_flashcard_edit_with_groq_api(
 ) -> str:
     """Chat for flashcard editing using Groq API."""
     try:
-        async with httpx.AsyncClient() as client:
-            system_prompt = """You are PrepWise, an AI assistant helping users improve and edit their flashcards.
+        client = get_groq_client()
+        system_prompt = """You are PrepWise, an AI assistant helping users improve and edit their flashcards.
 
 Your role is to:
 - Generate new flashcards based on user requests
@@ -898,76 +883,72 @@ If the user is asking for general help or explanations (not generating flashcard
 
 Always be helpful, clear, and educational."""
 
-            # Build context from current flashcards
-            context_parts = []
-            if flashcard_name:
-                context_parts.append(f"Flashcard Set Name: {flashcard_name}")
-            if filename:
-                context_parts.append(f"Source File: {filename}")
-            
-            # If a specific flashcard is selected, focus on that
+        # Build context from current flashcards
+        context_parts = []
+        if flashcard_name:
+            context_parts.append(f"Flashcard Set Name: {flashcard_name}")
+        if filename:
+            context_parts.append(f"Source File: {filename}")
+        
+        # If a specific flashcard is selected, focus on that
+        if selected_flashcard:
+            context_parts.append("\n=== FOCUS FLASHCARD (User wants help with this specific flashcard) ===")
+            context_parts.append(f"Front: {selected_flashcard.get('front', '')}")
+            context_parts.append(f"Back: {selected_flashcard.get('back', '')}")
+            context_parts.append("===\n")
+        
+        if current_flashcards:
             if selected_flashcard:
-                context_parts.append("\n=== FOCUS FLASHCARD (User wants help with this specific flashcard) ===")
-                context_parts.append(f"Front: {selected_flashcard.get('front', '')}")
-                context_parts.append(f"Back: {selected_flashcard.get('back', '')}")
-                context_parts.append("===\n")
-            
-            if current_flashcards and len(current_flashcards) > 0:
-                if selected_flashcard:
-                    context_parts.append("\nAll flashcards (for context):")
-                else:
-                    context_parts.append("\nCurrent flashcards:")
-                for i, f in enumerate(current_flashcards[:5], 1):  # Limit to first 5 for context
-                    context_parts.append(f"\nFlashcard {i}:")
-                    context_parts.append(f"Front: {f.get('front', '')}")
-                    context_parts.append(f"Back: {f.get('back', '')}")
-            
-            context = "\n".join(context_parts) if context_parts else "No current flashcards provided."
+                context_parts.append("\nAll flashcards (for context):")
+            else:
+                context_parts.append("\nCurrent flashcards:")
+            for i, f in enumerate(current_flashcards[:5], 1):  # Limit to first 5 for context
+                context_parts.append(f"\nFlashcard {i}:")
+                context_parts.append(f"Front: {f.get('front', '')}")
+                context_parts.append(f"Back: {f.get('back', '')}")
+        
+        context = "\n".join(context_parts) if context_parts else "No current flashcards provided."
 
-            user_prompt = f"""Context:
+        user_prompt = f"""Context:
 {context}
 
 User's request: {message}
 
 Please help the user with their flashcard editing request. If they're asking for new flashcards, provide them in the JSON format specified."""
 
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": settings.GROQ_MODEL,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": system_prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": user_prompt
-                        }
-                    ],
-                    "max_tokens": 2000,
-                    "temperature": 0.7,
-                    "top_p": 0.9
-                },
-                timeout=60.0
-            )
+        response = await client.post(
+            "/chat/completions",
+            content=orjson.dumps({
+                "model": settings.GROQ_MODEL,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": system_prompt
+                    },
+                    {
+                        "role": "user",
+                        "content": user_prompt
+                    }
+                ],
+                "max_tokens": 2000,
+                "temperature": 0.7,
+                "top_p": 0.9
+            }),
+            timeout=60.0
+        )
 
-            if response.status_code == 200:
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    reply = result["choices"][0]["message"]["content"].strip()
-                    print(f"SUCCESS: Groq flashcard edit chat response generated")
-                    return reply
-                else:
-                    raise Exception("Groq API returned unexpected format")
+        if response.status_code == 200:
+            result = orjson.loads(response.content)
+            if result.get("choices"):
+                reply = result["choices"][0]["message"]["content"].strip()
+                print(f"SUCCESS: Groq flashcard edit chat response generated")
+                return reply
             else:
-                error_text = response.text
-                print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
-                raise Exception(f"Groq API error: {response.status_code}")
+                raise Exception("Groq API returned unexpected format")
+        else:
+            error_text = response.text
+            print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
+            raise Exception(f"Groq API error: {response.status_code}")
 
     except Exception as e:
         print(f"ERROR: Groq API flashcard edit chat error: {str(e)}")
@@ -1041,8 +1022,8 @@ async def _chat_notes_edit_with_groq_api(
 ) -> str:
     """Chat for notes editing using Groq API."""
     try:
-        async with httpx.AsyncClient() as client:
-            system_prompt = """You are PrepWise, an AI assistant helping users improve and edit their study notes.
+        client = get_groq_client()
+        system_prompt = """You are PrepWise, an AI assistant helping users improve and edit their study notes.
 
 Your role is to:
 - Generate updated notes content based on user requests
@@ -1065,25 +1046,25 @@ CRITICAL INSTRUCTIONS:
 
 Always be helpful, clear, and educational, but most importantly, follow the user's specific instructions exactly."""
 
-            # Build context from current notes
-            context_parts = []
-            if notes_name:
-                context_parts.append(f"Notes Name: {notes_name}")
-            if filename:
-                context_parts.append(f"Source File: {filename}")
-            
-            if current_notes:
-                # Include current notes content (limit length to avoid token limits)
-                notes_preview = current_notes[:2000] if len(current_notes) > 2000 else current_notes
-                context_parts.append(f"\n=== CURRENT NOTES ===")
-                context_parts.append(notes_preview)
-                if len(current_notes) > 2000:
-                    context_parts.append(f"\n... (notes continue, {len(current_notes) - 2000} more characters)")
-                context_parts.append("===\n")
-            
-            context = "\n".join(context_parts) if context_parts else "No current notes provided."
+        # Build context from current notes
+        context_parts = []
+        if notes_name:
+            context_parts.append(f"Notes Name: {notes_name}")
+        if filename:
+            context_parts.append(f"Source File: {filename}")
+        
+        if current_notes:
+            # Include current notes content (limit length to avoid token limits)
+            notes_preview = current_notes[:2000] if len(current_notes) > 2000 else current_notes
+            context_parts.append(f"\n=== CURRENT NOTES ===")
+            context_parts.append(notes_preview)
+            if len(current_notes) > 2000:
+                context_parts.append(f"\n... (notes continue, {len(current_notes) - 2000} more characters)")
+            context_parts.append("===\n")
+        
+        context = "\n".join(context_parts) if context_parts else "No current notes provided."
 
-            user_prompt = f"""Context:
+        user_prompt = f"""Context:
 {context}
 
 User's request: {message}
@@ -1092,43 +1073,39 @@ IMPORTANT: Follow the user's request EXACTLY as specified. If they ask for a spe
 
 Please help the user with their notes editing request. If they're asking to update, modify, add, replace, or keep notes content, provide the COMPLETE updated notes text. Pay special attention to any specific quantities, formats, or requirements mentioned in their request. Otherwise, provide a helpful response."""
 
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": settings.GROQ_MODEL,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": system_prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": user_prompt
-                        }
-                    ],
-                    "max_tokens": 3000,
-                    "temperature": 0.7,
-                    "top_p": 0.9
-                },
-                timeout=60.0
-            )
+        response = await client.post(
+            "/chat/completions",
+            content=orjson.dumps({
+                "model": settings.GROQ_MODEL,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": system_prompt
+                    },
+                    {
+                        "role": "user",
+                        "content": user_prompt
+                    }
+                ],
+                "max_tokens": 3000,
+                "temperature": 0.7,
+                "top_p": 0.9
+            }),
+            timeout=60.0
+        )
 
-            if response.status_code == 200:
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    reply = result["choices"][0]["message"]["content"].strip()
-                    print(f"SUCCESS: Groq notes edit chat response generated")
-                    return reply
-                else:
-                    raise Exception("Groq API returned unexpected format")
+        if response.status_code == 200:
+            result = orjson.loads(response.content)
+            if result.get("choices"):
+                reply = result["choices"][0]["message"]["content"].strip()
+                print(f"SUCCESS: Groq notes edit chat response generated")
+                return reply
             else:
-                error_text = response.text
-                print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
-                raise Exception(f"Groq API error: {response.status_code}")
+                raise Exception("Groq API returned unexpected format")
+        else:
+            error_text = response.text
+            print(f"ERROR: Groq API error: {response.status_code} - {error_text}")
+            raise Exception(f"Groq API error: {response.status_code}")
 
     except Exception as e:
         print(f"ERROR: Groq API notes edit chat error: {str(e)}")
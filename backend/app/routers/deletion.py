@@ -1,13 +1,14 @@
-import httpx
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+import orjson
 from app.deps import get_current_user, User
-from app.config import settings
+from app.http_client import get_supabase_client
+from app.lookup_cache import invalidate_file, invalidate_flashcards, invalidate_quiz, invalidate_summary
 
 router = APIRouter()
 
-async def verify_resource_ownership(resource_id: str, table_name: str, user_id: str) -> Dict[str, Any]:
+async def verify_resource_ownership(resource_id: str, table_name: str, user_id: str, select: str = "id,user_id") -> Dict[str, Any]:
     """
     Verify that the resource belongs to the current user and return the resource data.
     
@@ -15,50 +16,47 @@ async def verify_resource_ownership(resource_id: str, table_name: str, user_id:
         resource_id: The ID of the resource to verify
         table_name: The table name (files, summaries, quizzes, flashcards)
         user_id: The current user's ID
+        select: Columns to fetch (must include user_id); only the ownership
+            columns by default, so e.g. a file's text isn't downloaded
         
     Returns:
-        Dict containing the resource data if found and owned by user
+        Dict containing the selected resource columns if found and owned by user
         
     Raises:
         HTTPException: 404 if resource not found, 403 if not owned by user
     """
     try:
-        async with httpx.AsyncClient() as client:
-            # Query the resource and verify ownership
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/{table_name}?id=eq.{resource_id}&select=*",
-                headers={
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Content-Type": "application/json"
-                }
+        client = get_supabase_client()
+        # Query the resource and verify ownership
+        response = await client.get(
+            f"/{table_name}?id=eq.{resource_id}&select={select}"
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Database query failed"
+            )
+        
+        data = orjson.loads(response.content)
+        
+        if not data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"{table_name[:-1].capitalize()} not found"
+            )
+        
+        resource = data[0]
+        
+        # Verify ownership
+        if resource.get("user_id") != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You can only delete your own resources"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Database query failed"
-                )
-            
-            data = response.json()
-            
-            if not data or len(data) == 0:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"{table_name[:-1].capitalize()} not found"
-                )
-            
-            resource = data[0]
-            
-            # Verify ownership
-            if resource.get("user_id") != user_id:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="You can only delete your own resources"
-                )
-            
-            return resource
-            
+        
+        return resource
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -79,23 +77,19 @@ async def delete_resource(table_name: str, resource_id: str) -> bool:
         True if deletion was successful
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{settings.SUPABASE_URL}/rest/v1/{table_name}?id=eq.{resource_id}",
-                headers={
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "apikey": settings.SUPABASE_SERVICE_KEY
-                }
+        client = get_supabase_client()
+        response = await client.delete(
+            f"/{table_name}?id=eq.{resource_id}"
+        )
+        
+        if response.status_code not in [200, 204]:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to delete {table_name[:-1]}"
             )
-            
-            if response.status_code not in [200, 204]:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to delete {table_name[:-1]}"
-                )
-            
-            return True
-            
+        
+        return True
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -125,8 +119,9 @@ async def delete_file(
     
     # Delete the file (CASCADE will handle related records)
     await delete_resource("files", file_id)
+    invalidate_file(file_id, current_user.id)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_200_OK,
         content={"deleted": True}
     )
@@ -144,12 +139,13 @@ async def delete_summary(
     """
     
     # Verify ownership before deletion
-    await verify_resource_ownership(summary_id, "summaries", current_user.id)
+    summary = await verify_resource_ownership(summary_id, "summaries", current_user.id, select="id,user_id,file_id")
     
     # Delete the summary
     await delete_resource("summaries", summary_id)
+    invalidate_summary(summary["file_id"], current_user.id)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_200_OK,
         content={"deleted": True}
     )
@@ -167,12 +163,13 @@ async def delete_quiz(
     """
     
     # Verify ownership before deletion
-    await verify_resource_ownership(quiz_id, "quizzes", current_user.id)
+    quiz = await verify_resource_ownership(quiz_id, "quizzes", current_user.id, select="id,user_id,file_id")
     
     # Delete the quiz
     await delete_resource("quizzes", quiz_id)
+    invalidate_quiz(quiz["file_id"], current_user.id)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_200_OK,
         content={"deleted": True}
     )
@@ -190,12 +187,13 @@ async def delete_flashcard(
     """
     
     # Verify ownership before deletion
-    await verify_resource_ownership(flashcard_id, "flashcards", current_user.id)
+    flashcard = await verify_resource_ownership(flashcard_id, "flashcards", current_user.id, select="id,user_id,file_id")
     
     # Delete the flashcard
     await delete_resource("flashcards", flashcard_id)
+    invalidate_flashcards(flashcard["file_id"], current_user.id)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_200_OK,
         content={"deleted": True}
     )
@@ -2,8 +2,9 @@ import tempfile
 import os
 import uuid
 from typing import Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse
+import orjson
 import pdfplumber
 import PyPDF2
 from docx import Document
@@ -13,9 +14,9 @@ try:
     _TESSERACT_AVAILABLE = True
 except ImportError:
     _TESSERACT_AVAILABLE = False
-import httpx
 from app.deps import get_current_user, User
-from app.config import settings
+from app.http_client import get_supabase_client
+from app.routers.ai_processing import PRESUMMARIZE_MIN_TOKENS, fast_token_estimate, presummarize_file
 
 router = APIRouter()
 
@@ -118,58 +119,51 @@ def extract_text_from_file(file_path: str, content_type: str) -> str:
 async def insert_file_to_supabase(user_id: str, filename: str, text_content: str, folder_id: str = None) -> str:
     """Insert file record into Supabase and return the file_id."""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.SUPABASE_URL}/rest/v1/files",
-                headers={
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Content-Type": "application/json",
-                    "Prefer": "return=representation"
-                },
-                json={
-                    "user_id": user_id,
-                    "filename": filename,
-                    "text_content": text_content,
-                    "folder_id": folder_id
-                }
-            )
-            
-            if response.status_code not in [200, 201]:
-                raise Exception(f"Supabase insert failed: {response.status_code} - {response.text}")
-            
-            # Get the actual file_id from the response
-            data = response.json()
-            if data and len(data) > 0:
-                return data[0]["id"]
-            else:
-                raise Exception("No file ID returned from database")
-            
+        client = get_supabase_client()
+        response = await client.post(
+            "/files",
+            headers={"Prefer": "return=representation"},
+            json={
+                "user_id": user_id,
+                "filename": filename,
+                "text_content": text_content,
+                "folder_id": folder_id
+            }
+        )
+        
+        if response.status_code not in [200, 201]:
+            raise Exception(f"Supabase insert failed: {response.status_code} - {response.text}")
+        
+        # Get the actual file_id from the response
+        data = orjson.loads(response.content)
+        if data:
+            return data[0]["id"]
+        else:
+            raise Exception("No file ID returned from database")
+        
     except Exception as e:
         raise Exception(f"Database error: {e}")
 
 async def get_default_folder_id(user_id: str) -> str:
     """Get the default 'Untitled' folder ID for a user"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/folders?user_id=eq.{user_id}&name=eq.Untitled",
-                headers={
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "apikey": settings.SUPABASE_SERVICE_KEY
-                }
-            )
+        client = get_supabase_client()
+        response = await client.get(
+            f"/folders?user_id=eq.{user_id}&name=eq.Untitled"
+        )
+        
+        folders = orjson.loads(response.content) if response.status_code == 200 else None
+        if folders:
+            return folders[0]["id"]
+        else:
+            raise Exception("Default folder not found")
             
-            if response.status_code == 200 and response.json():
-                return response.json()[0]["id"]
-            else:
-                raise Exception("Default folder not found")
-                
     except Exception as e:
         raise Exception(f"Error getting default folder: {e}")
 
 @router.post("/upload_file")
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     folder_id: str = Form(None),
     current_user: User = Depends(get_current_user)
@@ -184,6 +178,9 @@ async def upload_file(
     - Images (.png, .jpg, .jpeg)
     
     Maximum file size: 10MB
+    
+    Long files are summarized in the background after the response is sent,
+    so generating a quiz or flashcards from them later doesn't wait for it.
     """
     
     # Validate file type
@@ -225,7 +222,7 @@ async def upload_file(
             text_content = extract_text_from_file(temp_file_path, file.content_type)
             
             # Validate extracted text
-            if not text_content or len(text_content.strip()) == 0:
+            if not text_content or not text_content.strip():
                 raise HTTPException(
                     status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                     detail="Could not extract text from file. The file may be corrupted or contain no readable text."
@@ -261,7 +258,10 @@ async def upload_file(
                 folder_id=folder_id
             )
             
-            return JSONResponse(
+            if fast_token_estimate(text_content) > PRESUMMARIZE_MIN_TOKENS:
+                background_tasks.add_task(presummarize_file, file_id, text_content)
+            
+            return ORJSONResponse(
                 status_code=status.HTTP_201_CREATED,
                 content={
                     "file_id": file_id,
@@ -301,34 +301,29 @@ async def get_files_by_folder(
     Get all files for a specific folder.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/files",
-                headers={
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Content-Type": "application/json"
-                },
-                params={
-                    "folder_id": f"eq.{folder_id}",
-                    "user_id": f"eq.{current_user.id}",
-                    "select": "id,filename,text_content,created_at",
-                    "order": "created_at.desc"
-                }
+        client = get_supabase_client()
+        response = await client.get(
+            "/files",
+            params={
+                "folder_id": f"eq.{folder_id}",
+                "user_id": f"eq.{current_user.id}",
+                "select": "id,filename,text_content,created_at",
+                "order": "created_at.desc"
+            }
+        )
+        
+        if response.status_code == 200:
+            files = orjson.loads(response.content)
+            return ORJSONResponse(
+                status_code=status.HTTP_200_OK,
+                content=files
+            )
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to fetch files"
             )
             
-            if response.status_code == 200:
-                files = response.json()
-                return JSONResponse(
-                    status_code=status.HTTP_200_OK,
-                    content=files
-                )
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to fetch files"
-                )
-                
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
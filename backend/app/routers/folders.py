@@ -2,11 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
+import asyncio
 import uuid
 
 from app.deps import get_current_user, User
-from app.config import settings
+from app.http_client import get_supabase_client
 import httpx
+import orjson
 
 router = APIRouter()
 
@@ -68,39 +70,34 @@ async def create_folder(
                     break
         
         # Create folder in Supabase
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.SUPABASE_URL}/rest/v1/folders",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=representation"
-                },
-                json={
-                    "user_id": current_user.id,
-                    "name": folder_data.name,
-                    "color": folder_color
-                }
-            )
-            
-            if response.status_code != 201:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Failed to create folder"
-                )
-            
-            folder = response.json()[0]
-            
-            return FolderResponse(
-                id=folder["id"],
-                name=folder["name"],
-                color=folder["color"],
-                picture_url=folder.get("picture_url"),
-                created_at=folder["created_at"],
-                updated_at=folder["updated_at"],
-                materials_count=0
+        client = get_supabase_client()
+        response = await client.post(
+            "/folders",
+            headers={"Prefer": "return=representation"},
+            content=orjson.dumps({
+                "user_id": current_user.id,
+                "name": folder_data.name,
+                "color": folder_color
+            })
+        )
+        
+        if response.status_code != 201:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Failed to create folder"
             )
+        
+        folder = orjson.loads(response.content)[0]
+        
+        return FolderResponse(
+            id=folder["id"],
+            name=folder["name"],
+            color=folder["color"],
+            picture_url=folder.get("picture_url"),
+            created_at=folder["created_at"],
+            updated_at=folder["updated_at"],
+            materials_count=0
+        )
             
     except Exception as e:
         raise HTTPException(
@@ -116,11 +113,13 @@ async def get_user_folders(
     try:
         folders = await get_user_folders_from_db(current_user.id)
         
-        # Get material counts for each folder
+        # Get material counts for all folders concurrently
+        materials_counts = await asyncio.gather(
+            *(get_folder_materials_count(folder["id"]) for folder in folders)
+        )
+        
         folders_with_materials = []
-        for folder in folders:
-            materials_count = await get_folder_materials_count(folder["id"])
-            
+        for folder, materials_count in zip(folders, materials_counts):
             folders_with_materials.append(FolderWithMaterials(
                 id=folder["id"],
                 name=folder["name"],
@@ -148,36 +147,31 @@ async def get_folder(
     """Get a specific folder by ID with material counts"""
     try:
         # Get folder from database
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/folders?id=eq.{folder_id}&user_id=eq.{current_user.id}",
-                headers={
-                    "apikey": settings.SUPABASE_ANON_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                }
-            )
-            
-            if response.status_code != 200 or not response.json():
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Folder not found"
-                )
-            
-            folder = response.json()[0]
-            
-            # Get material counts
-            materials_count = await get_folder_materials_count(folder_id)
-            
-            return FolderWithMaterials(
-                id=folder["id"],
-                name=folder["name"],
-                color=folder["color"],
-                picture_url=folder.get("picture_url"),
-                created_at=folder["created_at"],
-                updated_at=folder["updated_at"],
-                materials_count=materials_count.summaries + materials_count.quizzes + materials_count.flashcards,  # Only count generated content
-                materials=materials_count
+        client = get_supabase_client()
+        response = await client.get(f"/folders?id=eq.{folder_id}&user_id=eq.{current_user.id}")
+        
+        folders = orjson.loads(response.content) if response.status_code == 200 else None
+        if not folders:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Folder not found"
             )
+        
+        folder = folders[0]
+        
+        # Get material counts
+        materials_count = await get_folder_materials_count(folder_id)
+        
+        return FolderWithMaterials(
+            id=folder["id"],
+            name=folder["name"],
+            color=folder["color"],
+            picture_url=folder.get("picture_url"),
+            created_at=folder["created_at"],
+            updated_at=folder["updated_at"],
+            materials_count=materials_count.summaries + materials_count.quizzes + materials_count.flashcards,  # Only count generated content
+            materials=materials_count
+        )
             
     except HTTPException:
         raise
@@ -215,35 +209,31 @@ async def update_folder(
         update_data["updated_at"] = datetime.utcnow().isoformat()
         
         # Update folder in database
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(
-                f"{settings.SUPABASE_URL}/rest/v1/folders?id=eq.{folder_id}&user_id=eq.{current_user.id}",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=representation"
-                },
-                json=update_data
-            )
-            
-            if response.status_code != 200 or not response.json():
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Folder not found"
-                )
-            
-            folder = response.json()[0]
-            
-            return FolderResponse(
-                id=folder["id"],
-                name=folder["name"],
-                color=folder["color"],
-                picture_url=folder.get("picture_url"),
-                created_at=folder["created_at"],
-                updated_at=folder["updated_at"],
-                materials_count=0  # Will be calculated separately if needed
+        client = get_supabase_client()
+        response = await client.patch(
+            f"/folders?id=eq.{folder_id}&user_id=eq.{current_user.id}",
+            headers={"Prefer": "return=representation"},
+            content=orjson.dumps(update_data)
+        )
+        
+        folders = orjson.loads(response.content) if response.status_code == 200 else None
+        if not folders:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Folder not found"
             )
+        
+        folder = folders[0]
+        
+        return FolderResponse(
+            id=folder["id"],
+            name=folder["name"],
+            color=folder["color"],
+            picture_url=folder.get("picture_url"),
+            created_at=folder["created_at"],
+            updated_at=folder["updated_at"],
+            materials_count=0  # Will be calculated separately if needed
+        )
             
     except HTTPException:
         raise
@@ -260,51 +250,40 @@ async def delete_folder(
 ):
     """Delete a folder and move its materials to the default folder"""
     try:
+        client = get_supabase_client()
         # Get or create the user's default folder (Untitled)
         default_folder = await get_or_create_default_folder(current_user.id)
         target_folder_id = default_folder["id"]
         # If we're deleting the default folder itself, create a new Untitled first and move materials there
         if folder_id == target_folder_id:
-            async with httpx.AsyncClient() as client:
-                create_resp = await client.post(
-                    f"{settings.SUPABASE_URL}/rest/v1/folders",
-                    headers={
-                        "apikey": settings.SUPABASE_ANON_KEY,
-                        "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                        "Content-Type": "application/json",
-                        "Prefer": "return=representation"
-                    },
-                    json={
-                        "user_id": current_user.id,
-                        "name": "Untitled",
-                        "color": FOLDER_COLORS[0]
-                    }
+            create_resp = await client.post(
+                "/folders",
+                headers={"Prefer": "return=representation"},
+                content=orjson.dumps({
+                    "user_id": current_user.id,
+                    "name": "Untitled",
+                    "color": FOLDER_COLORS[0]
+                })
+            )
+            created = orjson.loads(create_resp.content) if create_resp.status_code in (200, 201) else None
+            if not created:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Cannot delete default folder: could not create replacement"
                 )
-                if create_resp.status_code not in (200, 201) or not create_resp.json():
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Cannot delete default folder: could not create replacement"
-                    )
-                target_folder_id = create_resp.json()[0]["id"]
+            target_folder_id = created[0]["id"]
         # Move all materials from the folder to default (or new) folder
         await move_folder_materials_to_default(folder_id, target_folder_id)
         
         # Delete the folder
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{settings.SUPABASE_URL}/rest/v1/folders?id=eq.{folder_id}&user_id=eq.{current_user.id}",
-                headers={
-                    "apikey": settings.SUPABASE_ANON_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                }
+        response = await client.delete(f"/folders?id=eq.{folder_id}&user_id=eq.{current_user.id}")
+        
+        if response.status_code != 204:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Folder not found"
             )
             
-            if response.status_code != 204:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Folder not found"
-                )
-            
     except HTTPException:
         raise
     except Exception as e:
@@ -316,80 +295,46 @@ async def delete_folder(
 # Helper functions
 async def get_user_folders_from_db(user_id: str) -> List[dict]:
     """Get all folders for a user from database"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{settings.SUPABASE_URL}/rest/v1/folders?user_id=eq.{user_id}&order=created_at.asc",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-            }
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        return []
+    client = get_supabase_client()
+    response = await client.get(f"/folders?user_id=eq.{user_id}&order=created_at.asc")
+    
+    if response.status_code == 200:
+        return orjson.loads(response.content)
+    return []
+
+def _content_range_count(response: httpx.Response) -> int:
+    """Read the total from a count=exact response's Content-Range header (0 on failure)."""
+    if response.status_code != 200:
+        return 0
+    return int(response.headers.get("content-range", "0").split("/")[-1])
 
 async def get_folder_materials_count(folder_id: str) -> MaterialCount:
     """Get count of materials in a folder"""
-    async with httpx.AsyncClient() as client:
-        # Get counts for each material type using HEAD requests for count
-        files_response = await client.head(
-            f"{settings.SUPABASE_URL}/rest/v1/files?folder_id=eq.{folder_id}",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                "Prefer": "count=exact"
-            }
-        )
-        
-        summaries_response = await client.head(
-            f"{settings.SUPABASE_URL}/rest/v1/summaries?folder_id=eq.{folder_id}",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                "Prefer": "count=exact"
-            }
-        )
-        
-        quizzes_response = await client.head(
-            f"{settings.SUPABASE_URL}/rest/v1/quizzes?folder_id=eq.{folder_id}",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                "Prefer": "count=exact"
-            }
-        )
-        
-        flashcards_response = await client.head(
-            f"{settings.SUPABASE_URL}/rest/v1/flashcards?folder_id=eq.{folder_id}",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                "Prefer": "count=exact"
-            }
-        )
-        
-        return MaterialCount(
-            files=int(files_response.headers.get("content-range", "0").split("/")[-1]) if files_response.status_code == 200 else 0,
-            summaries=int(summaries_response.headers.get("content-range", "0").split("/")[-1]) if summaries_response.status_code == 200 else 0,
-            quizzes=int(quizzes_response.headers.get("content-range", "0").split("/")[-1]) if quizzes_response.status_code == 200 else 0,
-            flashcards=int(flashcards_response.headers.get("content-range", "0").split("/")[-1]) if flashcards_response.status_code == 200 else 0
-        )
+    client = get_supabase_client()
+    
+    # Get counts for each material type using HEAD requests for count, all at
+    # once over the shared connection pool
+    files_response, summaries_response, quizzes_response, flashcards_response = await asyncio.gather(*(
+        client.head(f"/{table}", params={"folder_id": f"eq.{folder_id}"}, headers={"Prefer": "count=exact"})
+        for table in ("files", "summaries", "quizzes", "flashcards")
+    ))
+    
+    return MaterialCount(
+        files=_content_range_count(files_response),
+        summaries=_content_range_count(summaries_response),
+        quizzes=_content_range_count(quizzes_response),
+        flashcards=_content_range_count(flashcards_response)
+    )
 
 async def get_default_folder(user_id: str) -> Optional[dict]:
     """Get the default 'Untitled' folder for a user"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{settings.SUPABASE_URL}/rest/v1/folders?user_id=eq.{user_id}&name=eq.Untitled",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-            }
-        )
-        
-        if response.status_code == 200 and response.json():
-            return response.json()[0]
-        return None
+    client = get_supabase_client()
+    response = await client.get(f"/folders?user_id=eq.{user_id}&name=eq.Untitled")
+    
+    folders = orjson.loads(response.content) if response.status_code == 200 else None
+    if folders:
+        return folders[0]
+    return None
 
 
 async def get_or_create_default_folder(user_id: str) -> dict:
@@ -397,71 +342,32 @@ async def get_or_create_default_folder(user_id: str) -> dict:
     default_folder = await get_default_folder(user_id)
     if default_folder:
         return default_folder
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{settings.SUPABASE_URL}/rest/v1/folders",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                "Content-Type": "application/json",
-                "Prefer": "return=representation"
-            },
-            json={
-                "user_id": user_id,
-                "name": "Untitled",
-                "color": FOLDER_COLORS[0]
-            }
+    client = get_supabase_client()
+    response = await client.post(
+        "/folders",
+        headers={"Prefer": "return=representation"},
+        content=orjson.dumps({
+            "user_id": user_id,
+            "name": "Untitled",
+            "color": FOLDER_COLORS[0]
+        })
+    )
+    created = orjson.loads(response.content) if response.status_code in (200, 201) else None
+    if not created:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Default folder not found and could not be created"
         )
-        if response.status_code not in (200, 201) or not response.json():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Default folder not found and could not be created"
-            )
-        return response.json()[0]
+    return created[0]
 
 async def move_folder_materials_to_default(folder_id: str, default_folder_id: str):
     """Move all materials from a folder to the default folder"""
-    async with httpx.AsyncClient() as client:
-        # Move files
-        await client.patch(
-            f"{settings.SUPABASE_URL}/rest/v1/files?folder_id=eq.{folder_id}",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={"folder_id": default_folder_id}
-        )
-        
-        # Move summaries
-        await client.patch(
-            f"{settings.SUPABASE_URL}/rest/v1/summaries?folder_id=eq.{folder_id}",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={"folder_id": default_folder_id}
-        )
-        
-        # Move quizzes
-        await client.patch(
-            f"{settings.SUPABASE_URL}/rest/v1/quizzes?folder_id=eq.{folder_id}",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={"folder_id": default_folder_id}
-        )
-        
-        # Move flashcards
-        await client.patch(
-            f"{settings.SUPABASE_URL}/rest/v1/flashcards?folder_id=eq.{folder_id}",
-            headers={
-                "apikey": settings.SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={"folder_id": default_folder_id}
-        )
+    client = get_supabase_client()
+    
+    # Move files, summaries, quizzes and flashcards at once; the tables are
+    # independent, so the PATCHes can share the connection concurrently
+    body = orjson.dumps({"folder_id": default_folder_id})
+    await asyncio.gather(*(
+        client.patch(f"/{table}?folder_id=eq.{folder_id}", content=body)
+        for table in ("files", "summaries", "quizzes", "flashcards")
+    ))
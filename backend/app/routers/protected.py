@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, field_validator
 import httpx
+import orjson
 from app.deps import get_current_user, User
-from app.config import settings
+from app.http_client import get_supabase_client
 
 router = APIRouter()
 
@@ -61,53 +62,42 @@ async def update_username(
     Update user's username.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            # Check if username is already taken
-            check_response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/user_profiles?username=eq.{request.username}&select=user_id",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                }
-            )
-            
-            if check_response.status_code == 200:
-                existing_profiles = check_response.json()
-                if existing_profiles and len(existing_profiles) > 0:
-                    # Check if it's not the current user's username
-                    if existing_profiles[0]["user_id"] != current_user.id:
-                        raise HTTPException(
-                            status_code=status.HTTP_409_CONFLICT,
-                            detail="Username is already taken"
-                        )
-            
-            # Update username in user_profiles table
-            update_response = await client.patch(
-                f"{settings.SUPABASE_URL}/rest/v1/user_profiles?user_id=eq.{current_user.id}",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                json={
-                    "username": request.username,
-                    "updated_at": "now()"
-                }
-            )
-            
-            if update_response.status_code not in [200, 204]:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to update username"
-                )
-            
-            return ProfileResponse(
-                user_id=current_user.id,
-                username=request.username,
-                email=current_user.email
+        client = get_supabase_client()
+        # Check if username is already taken
+        check_response = await client.get(f"/user_profiles?username=eq.{request.username}&select=user_id")
+        
+        if check_response.status_code == 200:
+            existing_profiles = orjson.loads(check_response.content)
+            if existing_profiles:
+                # Check if it's not the current user's username
+                if existing_profiles[0]["user_id"] != current_user.id:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="Username is already taken"
+                    )
+        
+        # Update username in user_profiles table
+        update_response = await client.patch(
+            f"/user_profiles?user_id=eq.{current_user.id}",
+            headers={"Prefer": "return=minimal"},
+            content=orjson.dumps({
+                "username": request.username,
+                "updated_at": "now()"
+            })
+        )
+        
+        if update_response.status_code not in [200, 204]:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to update username"
             )
-            
+        
+        return ProfileResponse(
+            user_id=current_user.id,
+            username=request.username,
+            email=current_user.email
+        )
+        
     except httpx.RequestError:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -0,0 +1,37 @@
+-- Migration: Add get_file_and_summary RPC
+-- Description: Returns a file and its latest summary in one call so the summarize endpoint needs a single round-trip
+-- Date: 2024
+
+-- Runs as the caller (SECURITY INVOKER), so the existing RLS policies on
+-- files and summaries still enforce ownership when called with a user token
+CREATE OR REPLACE FUNCTION get_file_and_summary(p_file_id UUID, p_user_id UUID)
+RETURNS JSON AS $$
+  SELECT json_build_object(
+    'file', (
+      SELECT json_build_object(
+        'id', f.id,
+        'filename', f.filename,
+        'text_content', f.text_content,
+        'folder_id', f.folder_id
+      )
+      FROM files f
+      WHERE f.id = p_file_id
+    ),
+    'summary', (
+      SELECT json_build_object(
+        'id', s.id,
+        'summary_text', s.summary_text,
+        'created_at', s.created_at,
+        'custom_name', s.custom_name
+      )
+      FROM summaries s
+      WHERE s.file_id = p_file_id AND s.user_id = p_user_id
+      ORDER BY s.created_at DESC
+      LIMIT 1
+    )
+  );
+$$ LANGUAGE sql STABLE SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION get_file_and_summary(UUID, UUID) TO authenticated;
+
+COMMENT ON FUNCTION get_file_and_summary(UUID, UUID) IS 'Returns {file, summary} for a file: the file row visible to the caller and its most recent summary';
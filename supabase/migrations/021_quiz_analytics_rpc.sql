@@ -0,0 +1,24 @@
+-- Migration: Add quiz_analytics RPC
+-- Description: Aggregates a user's quiz interactions in Postgres so the analytics endpoint receives four totals instead of every row
+-- Date: 2024
+
+-- Served by the existing idx_quiz_interactions_user_quiz (user_id, quiz_id) index
+CREATE OR REPLACE FUNCTION quiz_analytics(q UUID, u UUID)
+RETURNS TABLE (
+  total_attempted INTEGER,
+  total_correct INTEGER,
+  accuracy NUMERIC,
+  avg_time NUMERIC
+) AS $$
+  SELECT
+    COUNT(*)::INTEGER,
+    (COUNT(*) FILTER (WHERE is_correct))::INTEGER,
+    COALESCE(AVG(is_correct::INTEGER) * 100, 0),
+    COALESCE(AVG(time_taken), 0)
+  FROM quiz_interactions
+  WHERE quiz_id = q AND user_id = u;
+$$ LANGUAGE sql STABLE SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION quiz_analytics(UUID, UUID) TO authenticated, service_role;
+
+COMMENT ON FUNCTION quiz_analytics(UUID, UUID) IS 'Returns attempted/correct counts, accuracy percentage and average time per question for a user''s quiz';
@@ -0,0 +1,29 @@
+-- Migration: Enforce quiz ownership on quiz interactions
+-- Description: Rejects quiz_interactions rows for quizzes the user doesn't own, so the backend can insert without a separate ownership lookup
+-- Date: 2024
+
+-- The backend inserts with the service key, which bypasses RLS, so the check
+-- lives in a trigger. 42501 (insufficient_privilege) surfaces through
+-- PostgREST as a 403.
+CREATE OR REPLACE FUNCTION check_quiz_interaction_owner()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM quizzes
+    WHERE quizzes.id = NEW.quiz_id
+    AND quizzes.user_id = NEW.user_id
+  ) THEN
+    RAISE EXCEPTION 'Quiz % not found or not owned by user', NEW.quiz_id
+      USING ERRCODE = '42501';
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_check_quiz_interaction_owner ON quiz_interactions;
+CREATE TRIGGER trigger_check_quiz_interaction_owner
+BEFORE INSERT ON quiz_interactions
+FOR EACH ROW
+EXECUTE FUNCTION check_quiz_interaction_owner();
+
+COMMENT ON FUNCTION check_quiz_interaction_owner() IS 'Ensures a quiz interaction references a quiz owned by the same user';
@@ -0,0 +1,56 @@
+-- Migration: Add record_interaction_and_streak RPC
+-- Description: Records a quiz answer and updates the user's study streak in one transaction, replacing an insert plus a separate profile read/update
+-- Date: 2024
+
+-- p_today is passed by the backend so the streak uses the same calendar day
+-- as the rest of the app. Streak rules match update_study_streak: studied
+-- today -> unchanged, yesterday -> +1, otherwise -> 1. Users without a
+-- profile row get the interaction recorded and no profile update.
+CREATE OR REPLACE FUNCTION record_interaction_and_streak(
+  p_user_id UUID,
+  p_quiz_id UUID,
+  p_question_id INTEGER,
+  p_is_correct BOOLEAN,
+  p_time_taken NUMERIC,
+  p_today DATE
+)
+RETURNS JSON AS $$
+DECLARE
+  v_interaction_id UUID;
+  v_current_streak INTEGER;
+  v_longest_streak INTEGER;
+BEGIN
+  -- The ownership trigger on quiz_interactions rejects quizzes the user doesn't own
+  INSERT INTO quiz_interactions (user_id, quiz_id, question_id, is_correct, time_taken)
+  VALUES (p_user_id, p_quiz_id, p_question_id, p_is_correct, p_time_taken)
+  RETURNING id INTO v_interaction_id;
+
+  UPDATE user_profiles
+  SET
+    current_streak = CASE
+      WHEN last_study_date = p_today THEN current_streak
+      WHEN last_study_date = p_today - 1 THEN current_streak + 1
+      ELSE 1
+    END,
+    longest_streak = GREATEST(longest_streak, CASE
+      WHEN last_study_date = p_today THEN current_streak
+      WHEN last_study_date = p_today - 1 THEN current_streak + 1
+      ELSE 1
+    END),
+    last_study_date = p_today,
+    updated_at = NOW()
+  WHERE user_id = p_user_id
+  RETURNING current_streak, longest_streak INTO v_current_streak, v_longest_streak;
+
+  RETURN json_build_object(
+    'interaction_id', v_interaction_id,
+    'current_streak', COALESCE(v_current_streak, 1),
+    'longest_streak', COALESCE(v_longest_streak, 1),
+    'last_study_date', p_today
+  );
+END;
+$$ LANGUAGE plpgsql SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION record_interaction_and_streak(UUID, UUID, INTEGER, BOOLEAN, NUMERIC, DATE) TO authenticated, service_role;
+
+COMMENT ON FUNCTION record_interaction_and_streak(UUID, UUID, INTEGER, BOOLEAN, NUMERIC, DATE) IS 'Inserts a quiz interaction and updates the study streak atomically; returns the interaction id and new streak';
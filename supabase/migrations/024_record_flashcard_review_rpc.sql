@@ -0,0 +1,113 @@
+-- Migration: Add record_flashcard_review RPC
+-- Description: Records a flashcard review, updates the card state, daily analytics and study streak in one transaction, replacing the separate reads and writes for each
+-- Date: 2024
+
+-- Intervals match update_card_state: again -> 1 minute, good -> 10 minutes,
+-- easy -> 30 minutes (easy also bumps easy_count); correct_streak is kept as
+-- is and cards are never marked finished. p_today is passed by the backend so
+-- the analytics row and streak use the same calendar day as the rest of the
+-- app. Streak rules match record_interaction_and_streak.
+CREATE OR REPLACE FUNCTION record_flashcard_review(
+  p_user_id UUID,
+  p_flashcard_set_id UUID,
+  p_flashcard_id INTEGER,
+  p_rating TEXT,
+  p_time_taken NUMERIC,
+  p_today DATE
+)
+RETURNS JSON AS $$
+DECLARE
+  v_review_id UUID;
+  v_interval INTEGER;
+  v_state flashcard_card_states%ROWTYPE;
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM flashcards
+    WHERE id = p_flashcard_set_id AND user_id = p_user_id
+  ) THEN
+    RAISE EXCEPTION 'Flashcard set not found or access denied'
+      USING ERRCODE = '42501';
+  END IF;
+
+  v_interval := CASE p_rating
+    WHEN 'good' THEN 10
+    WHEN 'easy' THEN 30
+    ELSE 1
+  END;
+
+  INSERT INTO flashcard_reviews (user_id, flashcard_set_id, flashcard_id, rating, time_taken)
+  VALUES (p_user_id, p_flashcard_set_id, p_flashcard_id, p_rating, p_time_taken)
+  RETURNING id INTO v_review_id;
+
+  INSERT INTO flashcard_card_states (
+    user_id, flashcard_set_id, flashcard_id, interval, due_time,
+    correct_streak, easy_count, is_finished, updated_at
+  )
+  VALUES (
+    p_user_id, p_flashcard_set_id, p_flashcard_id, v_interval,
+    NOW() + make_interval(mins => v_interval),
+    0, (p_rating = 'easy')::INTEGER, FALSE, NOW()
+  )
+  ON CONFLICT (user_id, flashcard_set_id, flashcard_id) DO UPDATE
+  SET
+    interval = EXCLUDED.interval,
+    due_time = EXCLUDED.due_time,
+    easy_count = flashcard_card_states.easy_count + EXCLUDED.easy_count,
+    is_finished = FALSE,
+    updated_at = NOW()
+  RETURNING * INTO v_state;
+
+  INSERT INTO flashcard_daily_analytics (
+    user_id, date, total_reviewed, again_count, good_count, easy_count,
+    total_finished, total_time_spent, updated_at
+  )
+  VALUES (
+    p_user_id, p_today, 1,
+    (p_rating = 'again')::INTEGER,
+    (p_rating = 'good')::INTEGER,
+    (p_rating = 'easy')::INTEGER,
+    v_state.is_finished::INTEGER, p_time_taken, NOW()
+  )
+  ON CONFLICT (user_id, date) DO UPDATE
+  SET
+    total_reviewed = flashcard_daily_analytics.total_reviewed + 1,
+    again_count = flashcard_daily_analytics.again_count + EXCLUDED.again_count,
+    good_count = flashcard_daily_analytics.good_count + EXCLUDED.good_count,
+    easy_count = flashcard_daily_analytics.easy_count + EXCLUDED.easy_count,
+    total_finished = flashcard_daily_analytics.total_finished + EXCLUDED.total_finished,
+    total_time_spent = flashcard_daily_analytics.total_time_spent + EXCLUDED.total_time_spent,
+    updated_at = NOW();
+
+  UPDATE user_profiles
+  SET
+    current_streak = CASE
+      WHEN last_study_date = p_today THEN current_streak
+      WHEN last_study_date = p_today - 1 THEN current_streak + 1
+      ELSE 1
+    END,
+    longest_streak = GREATEST(longest_streak, CASE
+      WHEN last_study_date = p_today THEN current_streak
+      WHEN last_study_date = p_today - 1 THEN current_streak + 1
+      ELSE 1
+    END),
+    last_study_date = p_today,
+    updated_at = NOW()
+  WHERE user_id = p_user_id;
+
+  RETURN json_build_object(
+    'review_id', v_review_id,
+    'card_state', json_build_object(
+      'flashcard_id', v_state.flashcard_id,
+      'interval', v_state.interval,
+      'due_time', v_state.due_time,
+      'correct_streak', v_state.correct_streak,
+      'easy_count', v_state.easy_count,
+      'is_finished', v_state.is_finished
+    )
+  );
+END;
+$$ LANGUAGE plpgsql SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION record_flashcard_review(UUID, UUID, INTEGER, TEXT, NUMERIC, DATE) TO authenticated, service_role;
+
+COMMENT ON FUNCTION record_flashcard_review(UUID, UUID, INTEGER, TEXT, NUMERIC, DATE) IS 'Records a flashcard review and updates card state, daily analytics and study streak atomically; returns the review id and new card state';
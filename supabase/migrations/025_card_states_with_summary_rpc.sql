@@ -0,0 +1,39 @@
+-- Migration: Add get_card_states_with_summary RPC
+-- Description: Returns a flashcard set's card states together with finished/due counts computed in the database, so clients don't need every row to show them
+-- Date: 2024
+
+CREATE OR REPLACE FUNCTION get_card_states_with_summary(
+  p_user_id UUID,
+  p_flashcard_set_id UUID
+)
+RETURNS JSON AS $$
+  SELECT json_build_object(
+    'card_states', COALESCE(
+      json_agg(
+        json_build_object(
+          'flashcard_id', flashcard_id,
+          'interval', interval,
+          'due_time', due_time,
+          'correct_streak', correct_streak,
+          'easy_count', easy_count,
+          'is_finished', is_finished
+        )
+        ORDER BY flashcard_id
+      ),
+      '[]'::json
+    ),
+    'summary', json_build_object(
+      'total', COUNT(*),
+      'finished', COUNT(*) FILTER (WHERE is_finished),
+      'due_now', COUNT(*) FILTER (WHERE due_time <= NOW()),
+      'avg_interval', COALESCE(ROUND(AVG(interval), 2), 0)
+    )
+  )
+  FROM flashcard_card_states
+  WHERE user_id = p_user_id
+    AND flashcard_set_id = p_flashcard_set_id;
+$$ LANGUAGE sql STABLE SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION get_card_states_with_summary(UUID, UUID) TO authenticated, service_role;
+
+COMMENT ON FUNCTION get_card_states_with_summary(UUID, UUID) IS 'Returns card states for a flashcard set plus total, finished, due-now and average interval aggregates';
@@ -0,0 +1,158 @@
+-- Migration: Add anki_step and review_card functions
+-- Description: Moves the card scheduling arithmetic into a pure SQL-side function and applies it in a single upsert, so a card's state is never read into the app just to compute its next one
+-- Date: 2024
+
+-- Computes a card's next state from a rating. Matches update_card_state:
+-- again -> 1 minute, good -> 10 minutes, easy -> 30 minutes (easy also bumps
+-- easy_count); correct_streak is kept as is and cards are never finished.
+-- cur_state is NULL for a card that hasn't been reviewed yet.
+CREATE OR REPLACE FUNCTION anki_step(
+  p_rating TEXT,
+  cur_state flashcard_card_states
+)
+RETURNS flashcard_card_states AS $$
+DECLARE
+  v_next flashcard_card_states := cur_state;
+BEGIN
+  v_next.interval := CASE p_rating
+    WHEN 'good' THEN 10
+    WHEN 'easy' THEN 30
+    ELSE 1
+  END;
+  v_next.due_time := NOW() + make_interval(mins => v_next.interval);
+  v_next.correct_streak := COALESCE(cur_state.correct_streak, 0);
+  v_next.easy_count := COALESCE(cur_state.easy_count, 0) + (p_rating = 'easy')::INTEGER;
+  v_next.is_finished := FALSE;
+  v_next.updated_at := NOW();
+  RETURN v_next;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Applies anki_step to a card in one upsert, so concurrent reviews of the
+-- same card can't overwrite each other's read-modify-write
+CREATE OR REPLACE FUNCTION review_card(
+  p_user_id UUID,
+  p_flashcard_set_id UUID,
+  p_flashcard_id INTEGER,
+  p_rating TEXT
+)
+RETURNS flashcard_card_states AS $$
+DECLARE
+  v_first flashcard_card_states;
+  v_state flashcard_card_states;
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM flashcards
+    WHERE id = p_flashcard_set_id AND user_id = p_user_id
+  ) THEN
+    RAISE EXCEPTION 'Flashcard set not found or access denied'
+      USING ERRCODE = '42501';
+  END IF;
+
+  v_first := anki_step(p_rating, NULL::flashcard_card_states);
+
+  INSERT INTO flashcard_card_states (
+    user_id, flashcard_set_id, flashcard_id, interval, due_time,
+    correct_streak, easy_count, is_finished, updated_at
+  )
+  VALUES (
+    p_user_id, p_flashcard_set_id, p_flashcard_id, v_first.interval,
+    v_first.due_time, v_first.correct_streak, v_first.easy_count,
+    v_first.is_finished, v_first.updated_at
+  )
+  ON CONFLICT (user_id, flashcard_set_id, flashcard_id) DO UPDATE
+  SET (interval, due_time, correct_streak, easy_count, is_finished, updated_at) = (
+    SELECT s.interval, s.due_time, s.correct_streak, s.easy_count, s.is_finished, s.updated_at
+    FROM anki_step(p_rating, flashcard_card_states) s
+  )
+  RETURNING * INTO v_state;
+
+  RETURN v_state;
+END;
+$$ LANGUAGE plpgsql SECURITY INVOKER;
+
+-- record_flashcard_review now schedules the card through review_card instead
+-- of its own copy of the interval rules
+CREATE OR REPLACE FUNCTION record_flashcard_review(
+  p_user_id UUID,
+  p_flashcard_set_id UUID,
+  p_flashcard_id INTEGER,
+  p_rating TEXT,
+  p_time_taken NUMERIC,
+  p_today DATE
+)
+RETURNS JSON AS $$
+DECLARE
+  v_review_id UUID;
+  v_state flashcard_card_states%ROWTYPE;
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM flashcards
+    WHERE id = p_flashcard_set_id AND user_id = p_user_id
+  ) THEN
+    RAISE EXCEPTION 'Flashcard set not found or access denied'
+      USING ERRCODE = '42501';
+  END IF;
+
+  INSERT INTO flashcard_reviews (user_id, flashcard_set_id, flashcard_id, rating, time_taken)
+  VALUES (p_user_id, p_flashcard_set_id, p_flashcard_id, p_rating, p_time_taken)
+  RETURNING id INTO v_review_id;
+
+  v_state := review_card(p_user_id, p_flashcard_set_id, p_flashcard_id, p_rating);
+
+  INSERT INTO flashcard_daily_analytics (
+    user_id, date, total_reviewed, again_count, good_count, easy_count,
+    total_finished, total_time_spent, updated_at
+  )
+  VALUES (
+    p_user_id, p_today, 1,
+    (p_rating = 'again')::INTEGER,
+    (p_rating = 'good')::INTEGER,
+    (p_rating = 'easy')::INTEGER,
+    v_state.is_finished::INTEGER, p_time_taken, NOW()
+  )
+  ON CONFLICT (user_id, date) DO UPDATE
+  SET
+    total_reviewed = flashcard_daily_analytics.total_reviewed + 1,
+    again_count = flashcard_daily_analytics.again_count + EXCLUDED.again_count,
+    good_count = flashcard_daily_analytics.good_count + EXCLUDED.good_count,
+    easy_count = flashcard_daily_analytics.easy_count + EXCLUDED.easy_count,
+    total_finished = flashcard_daily_analytics.total_finished + EXCLUDED.total_finished,
+    total_time_spent = flashcard_daily_analytics.total_time_spent + EXCLUDED.total_time_spent,
+    updated_at = NOW();
+
+  UPDATE user_profiles
+  SET
+    current_streak = CASE
+      WHEN last_study_date = p_today THEN current_streak
+      WHEN last_study_date = p_today - 1 THEN current_streak + 1
+      ELSE 1
+    END,
+    longest_streak = GREATEST(longest_streak, CASE
+      WHEN last_study_date = p_today THEN current_streak
+      WHEN last_study_date = p_today - 1 THEN current_streak + 1
+      ELSE 1
+    END),
+    last_study_date = p_today,
+    updated_at = NOW()
+  WHERE user_id = p_user_id;
+
+  RETURN json_build_object(
+    'review_id', v_review_id,
+    'card_state', json_build_object(
+      'flashcard_id', v_state.flashcard_id,
+      'interval', v_state.interval,
+      'due_time', v_state.due_time,
+      'correct_streak', v_state.correct_streak,
+      'easy_count', v_state.easy_count,
+      'is_finished', v_state.is_finished
+    )
+  );
+END;
+$$ LANGUAGE plpgsql SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION anki_step(TEXT, flashcard_card_states) TO authenticated, service_role;
+GRANT EXECUTE ON FUNCTION review_card(UUID, UUID, INTEGER, TEXT) TO authenticated, service_role;
+
+COMMENT ON FUNCTION anki_step(TEXT, flashcard_card_states) IS 'Returns the next scheduling state of a flashcard for a rating (again/good/easy)';
+COMMENT ON FUNCTION review_card(UUID, UUID, INTEGER, TEXT) IS 'Upserts a flashcard card state using anki_step and returns the new state';
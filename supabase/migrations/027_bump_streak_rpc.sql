@@ -0,0 +1,39 @@
+-- Migration: Add bump_streak RPC
+-- Description: Updates a user's study streak in a single statement, replacing a profile read followed by a separate update
+-- Date: 2024
+
+-- Same rules as record_interaction_and_streak and record_flashcard_review,
+-- for callers that record study activity without them: studied today ->
+-- unchanged, yesterday -> +1, otherwise -> 1. p_today is passed by the
+-- backend so the streak uses the same calendar day as the rest of the app.
+-- Returns NULL when the user has no profile row.
+CREATE OR REPLACE FUNCTION bump_streak(
+  p_user_id UUID,
+  p_today DATE
+)
+RETURNS JSON AS $$
+  UPDATE user_profiles
+  SET
+    current_streak = CASE
+      WHEN last_study_date = p_today THEN current_streak
+      WHEN last_study_date = p_today - 1 THEN current_streak + 1
+      ELSE 1
+    END,
+    longest_streak = GREATEST(longest_streak, CASE
+      WHEN last_study_date = p_today THEN current_streak
+      WHEN last_study_date = p_today - 1 THEN current_streak + 1
+      ELSE 1
+    END),
+    last_study_date = p_today,
+    updated_at = NOW()
+  WHERE user_id = p_user_id
+  RETURNING json_build_object(
+    'current_streak', current_streak,
+    'longest_streak', longest_streak,
+    'last_study_date', last_study_date
+  );
+$$ LANGUAGE sql VOLATILE SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION bump_streak(UUID, DATE) TO authenticated, service_role;
+
+COMMENT ON FUNCTION bump_streak(UUID, DATE) IS 'Updates the study streak for a day of study activity and returns the new streak (NULL if the user has no profile)';
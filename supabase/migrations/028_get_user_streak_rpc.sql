@@ -0,0 +1,22 @@
+-- Migration: Add get_user_streak RPC
+-- Description: Returns a user's study streak with defaults filled in by the database, so the API needs no fallback branches for missing profiles or NULL columns
+-- Date: 2024
+
+-- Always returns exactly one object: a user without a profile row (or with
+-- NULL streak columns) gets zeros and a NULL last_study_date.
+CREATE OR REPLACE FUNCTION get_user_streak(
+  p_user_id UUID
+)
+RETURNS JSON AS $$
+  SELECT json_build_object(
+    'current_streak', COALESCE(p.current_streak, 0),
+    'longest_streak', COALESCE(p.longest_streak, 0),
+    'last_study_date', p.last_study_date
+  )
+  FROM (SELECT 1) AS one
+  LEFT JOIN user_profiles p ON p.user_id = p_user_id;
+$$ LANGUAGE sql STABLE SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION get_user_streak(UUID) TO authenticated, service_role;
+
+COMMENT ON FUNCTION get_user_streak(UUID) IS 'Returns current_streak, longest_streak and last_study_date for a user, defaulting to 0/0/NULL';
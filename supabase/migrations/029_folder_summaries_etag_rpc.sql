@@ -0,0 +1,29 @@
+-- Migration: Add get_folder_summaries_etag RPC
+-- Description: Returns a fingerprint of a folder's summary listing so the API can answer conditional requests with 304 without fetching the list
+-- Date: 2024
+
+-- Covers every column the listing shows (id, created_at, custom_name and the
+-- file's name), so adding, removing or renaming a summary or its file changes
+-- the value.
+CREATE OR REPLACE FUNCTION get_folder_summaries_etag(
+  p_user_id UUID,
+  p_folder_id UUID
+)
+RETURNS TEXT AS $$
+  SELECT md5(COALESCE(
+    string_agg(
+      s.id::text || '|' || s.created_at::text || '|' ||
+        COALESCE(s.custom_name, '') || '|' || COALESCE(f.filename, ''),
+      ',' ORDER BY s.created_at DESC, s.id
+    ),
+    ''
+  ))
+  FROM summaries s
+  LEFT JOIN files f ON f.id = s.file_id
+  WHERE s.user_id = p_user_id
+    AND s.folder_id = p_folder_id;
+$$ LANGUAGE sql STABLE SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION get_folder_summaries_etag(UUID, UUID) TO authenticated, service_role;
+
+COMMENT ON FUNCTION get_folder_summaries_etag(UUID, UUID) IS 'Returns an md5 fingerprint of the summaries listed in a folder (ids, dates, custom names and file names)';
@@ -0,0 +1,16 @@
+-- Migration: Covering index for folder summary listings
+-- Description: Adds a (folder_id, user_id, created_at DESC) index that serves the folder summaries listing's filter and sort in one index scan
+-- Date: 2024
+
+-- Matches folder_id=eq & user_id=eq & order=created_at.desc; the INCLUDE
+-- columns are the rest of the listing's select. The embedded files(filename)
+-- is looked up through the files primary key, and summaries(file_id) is
+-- already indexed by idx_summaries_file_id
+CREATE INDEX IF NOT EXISTS idx_summaries_folder_user_created
+  ON summaries (folder_id, user_id, created_at DESC)
+  INCLUDE (id, file_id, custom_name);
+
+-- folder_id alone is a prefix of the new index
+DROP INDEX IF EXISTS idx_summaries_folder_id;
+
+COMMENT ON INDEX idx_summaries_folder_user_created IS 'Serves the folder summaries listing (filter by folder and user, newest first)';